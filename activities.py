@@ -0,0 +1,56 @@
+"""
+Compiled activity catalog.
+
+`ActivityCatalog` is built once from an activities pool
+({ai_name: {"safe": [...], "suspicious": [...]}}) and gives every activity a
+dense integer ID. Activity sets are int bitmasks over those IDs, so checks
+like "which of today's activities are suspicious" are bit tests:
+
+    catalog = ActivityCatalog(pools)
+    suspicious = catalog.suspicious_in(ai.daily_activity_ids)
+
+IDs run AI by AI, safe before suspicious, in pool order.
+"""
+
+import zlib
+
+KINDS = ("safe", "suspicious")
+
+
+class ActivityCatalog:
+    """Dense activity IDs plus per-AI safe/suspicious bitmasks."""
+
+    def __init__(self, pools):
+        texts, owners = [], []
+        self.pool_ids = {}
+        self.pool_masks = {}
+        self.suspicious_mask = 0
+        for name, pool in pools.items():
+            self.pool_ids[name], self.pool_masks[name] = {}, {}
+            for kind in KINDS:
+                start = len(texts)
+                texts.extend(pool[kind])
+                owners.extend([name] * len(pool[kind]))
+                ids = tuple(range(start, len(texts)))
+                mask = ((1 << len(ids)) - 1) << start
+                self.pool_ids[name][kind] = ids
+                self.pool_masks[name][kind] = mask
+                if kind == "suspicious":
+                    self.suspicious_mask |= mask
+        self.texts = tuple(texts)
+        self.owners = tuple(owners)
+        self.ai_names = tuple(pools)
+        self.ids = {text: i for i, text in enumerate(texts)}
+        # Identifies the catalog in saved games; changes whenever an ID would.
+        self.crc = zlib.crc32("\n".join(f"{owner}\t{text}" for owner, text in zip(owners, texts)).encode("utf-8"))
+
+    def __len__(self):
+        return len(self.texts)
+
+    def is_suspicious(self, activity_id):
+        return bool(self.suspicious_mask >> activity_id & 1)
+
+    def suspicious_in(self, activity_ids):
+        """The suspicious IDs among activity_ids, in their original order."""
+        suspicious = self.suspicious_mask
+        return [activity_id for activity_id in activity_ids if suspicious >> activity_id & 1]
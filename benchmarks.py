@@ -0,0 +1,391 @@
+"""
+Benchmarks for the game's hot paths.
+
+Each benchmark times one operation repeatedly and reports throughput
+(ops/sec), per-op latency percentiles and the peak memory allocated by a
+single op (measured in a separate traced run, so tracing does not skew the
+timings). LLM calls go to the deterministic stub backend with the response
+cache disabled, so the numbers do not depend on the network.
+
+    python benchmarks.py                      # run all, compare with the baseline
+    python benchmarks.py wordle               # only benchmarks whose name contains "wordle"
+    python benchmarks.py --save-baseline      # record the current numbers as the baseline
+    python benchmarks.py --import-report      # slowest imports when starting the game
+
+Every benchmark is timed --repeat times, in rounds over all of them so a
+slow spell on the machine hits one round rather than every repeat of one
+benchmark. A result is the median of the rounds' median latencies; its p95,
+p99 and peak memory are the worst of the rounds.
+
+The run fails (exit status 1) when a benchmark's median latency exceeds the
+baseline's p95 by more than --threshold, or its peak memory grows by more
+than --threshold. Whole runs drift together by up to ~60% on a shared
+machine (CPU frequency, neighbours), so each round also times a fixed
+calibration loop, and when the machine is slower than it was for the
+baseline the latency limits grow in proportion. The baseline's p95 covers
+the remaining round-to-round noise, so only real regressions fail the run.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE_PATH = os.path.join(REPO_DIR, "benchmarks_baseline.json")
+DEFAULT_THRESHOLD = 0.25        # allowed growth beyond the baseline's p95 (latency) or peak (memory)
+DEFAULT_MIN_TIME = 1.0          # seconds of timing per benchmark and round
+DEFAULT_REPEAT = 3              # rounds; each result is the median of its rounds
+SAMPLE_TIME = 0.01              # target duration of one timed sample
+MEMORY_SLACK = 16 * 1024        # peak-memory growth below this many bytes is noise
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register a benchmark: a setup function returning the operation to time."""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+@benchmark("wordle.score_guess")
+def bench_score_guess():
+    from wordle_engine import score_guess
+    from wordlist import get_word_list
+
+    word_list = get_word_list()
+    rng = random.Random(0)
+    pairs = [(word_list.random_word(rng), word_list.random_word(rng)) for _ in range(100)]
+    return lambda: [score_guess(guess, answer) for guess, answer in pairs]
+
+
+@benchmark("wordle.pattern_lookup")
+def bench_pattern_lookup():
+    from pattern_matrix import get_pattern_matrix
+    from wordlist import get_word_list
+
+    word_list = get_word_list()
+    patterns = get_pattern_matrix(word_list)
+    rng = random.Random(0)
+    pairs = [(word_list.random_word(rng), word_list.random_word(rng)) for _ in range(100)]
+    return lambda: [patterns.pattern(guess, answer) for guess, answer in pairs]
+
+
+@benchmark("wordle.load_word_list")
+def bench_load_word_list():
+    from wordlist import DEFAULT_WORDS_PATH, load_word_list
+
+    return lambda: load_word_list(DEFAULT_WORDS_PATH)
+
+
+@benchmark("wordle.load_pattern_matrix")
+def bench_load_pattern_matrix():
+    from pattern_matrix import get_pattern_matrix, load_matrix
+    from wordlist import get_word_list
+
+    word_list = get_word_list()
+    get_pattern_matrix(word_list)       # make sure the cache file exists
+    return lambda: load_matrix(word_list)
+
+
+@benchmark("wordle.hint")
+def bench_hint():
+    from wordle_solver import get_solver
+
+    solver = get_solver()
+    patterns = solver.patterns
+    history = [("crane", patterns.pattern("crane", "house"))]
+    return lambda: solver.suggest(history, top_n=3)
+
+
+@benchmark("game.generate_daily_activities")
+def bench_generate_daily_activities():
+    from game import Game
+
+    game = Game(session_id="benchmark")
+
+    def run():
+        for ai in game.ais:
+            ai.history_ids.clear()
+        for day in range(1, 31):
+            game.time_day = day
+            game.generate_daily_activities()
+    return run
+
+
+@benchmark("prompts.turn_message")
+def bench_turn_message():
+    from game import Game
+    from prompts import PromptBuilder
+
+    game = Game(session_id="benchmark")
+    game.advance_day()
+    game.advance_day()
+    builder = PromptBuilder()
+    questions = ["What did you do today?", "Tell me about day 1.", "What happened yesterday?",
+                 "Why did you run the drills?"]
+
+    def run():
+        for ai in game.ais:
+            builder.system_message(ai)
+            for question in questions:
+                builder.turn_message(ai, game.time_day, question)
+    return run
+
+
+# Player input for the scripted playthrough: menu answers, chat lines and
+# Wordle guesses are consumed separately so the script does not depend on
+# when the (random) Wordle answer is found.
+PLAYTHROUGH_MENU = [
+    "", "",                 # intro, start investigating
+    "2", "1", "1", "",      # view ATLAS's activities
+    "2", "2", "2", "",      # talk with ORACLE
+    "3", "",                # review clues
+    "5",                    # mini-game
+    "6",                    # next day
+    "2", "3", "1", "",      # view NEXUS's activities
+    "4", "1",               # accuse ATLAS
+    "n",                    # do not play again
+]
+PLAYTHROUGH_CHAT = ["What did you do today?", "Tell me about day 1.", "Why was that necessary?"]
+PLAYTHROUGH_GUESSES = ["hint", "crane", "audio", "lymph", "dough", "wreck", "still"]
+
+
+@benchmark("game.playthrough")
+def bench_playthrough():
+    import huggingface
+    from game import Game
+    from llm_cache import set_response_cache
+    from session import Ask, GameSession
+
+    huggingface.set_backend("stub")
+    set_response_cache(None)
+
+    def run():
+        menu, chat, guesses = iter(PLAYTHROUGH_MENU), iter(PLAYTHROUGH_CHAT), iter(PLAYTHROUGH_GUESSES)
+        session = GameSession(Game(session_id="benchmark"))
+        effect = session.start()[-1]
+        while not session.finished:
+            if isinstance(effect, Ask):
+                if effect.kind == "chat":
+                    line = next(chat)
+                elif "guess" in effect.prompt:
+                    line = next(guesses)
+                else:
+                    line = next(menu)
+                effect = session.send(line)[-1]
+            else:
+                text = huggingface.generate_text_game(effect.prompt, effect.max_tokens, persona=effect.persona,
+                                                      system=effect.system, cache_key=effect.cache_key)
+                effect = session.send((text, False))[-1]
+    return run
+
+
+# Modules that starting the game must not import (see huggingface.load_client_stack).
+LAZY_MODULES = ("openai", "httpx", "httpx2")
+
+
+def import_times(module):
+    """Import module in a fresh interpreter under `python -X importtime`.
+
+    Returns {imported module: (self µs, cumulative µs)}.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if self_us.strip().isdigit():
+            times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+@benchmark("startup.import_game")
+def bench_import_game():
+    def run():
+        eager = [name for name in LAZY_MODULES if name in import_times("game")]
+        if eager:
+            raise AssertionError(f"importing game loads {', '.join(eager)}; the LLM client stack must stay lazy")
+    return run
+
+
+def print_import_report(module="game", top=20):
+    times = import_times(module)
+    print(f"{'module':40} {'self ms':>9} {'cumulative ms':>14}")
+    for name, (self_us, cumulative_us) in sorted(times.items(), key=lambda item: -item[1][1])[:top]:
+        print(f"{name:40} {self_us / 1000:9.1f} {cumulative_us / 1000:14.1f}")
+
+
+def calibrate():
+    """A fixed pure-Python workload: its timing tracks how fast the machine is right now."""
+    total = 0
+    for i in range(20000):
+        total += i * i % 7
+    return total
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an ascending list."""
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def measure(op, min_time=DEFAULT_MIN_TIME):
+    """Time op; returns a dict of ops/sec, latency percentiles (µs) and peak memory (bytes).
+
+    Fast ops are batched so each timed sample lasts about SAMPLE_TIME; the
+    percentiles are then over per-op averages of those samples.
+    """
+    op()                                    # warm up caches and lazy imports
+    start = time.perf_counter()
+    op()
+    once = time.perf_counter() - start
+    number = max(1, int(SAMPLE_TIME / once)) if once > 0 else 1000
+
+    samples, total_ops, elapsed = [], 0, 0.0
+    while elapsed < min_time or len(samples) < 5:
+        start = time.perf_counter()
+        for _ in range(number):
+            op()
+        duration = time.perf_counter() - start
+        samples.append(duration / number)
+        total_ops += number
+        elapsed += duration
+
+    tracemalloc.start()
+    try:
+        op()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    samples.sort()
+    return {
+        "ops_per_sec": total_ops / elapsed,
+        "p50_us": percentile(samples, 50) * 1e6,
+        "p95_us": percentile(samples, 95) * 1e6,
+        "p99_us": percentile(samples, 99) * 1e6,
+        "peak_memory_bytes": peak,
+    }
+
+
+def combine(rounds):
+    """One result from a benchmark's rounds: the median of their medians, the worst of the rest."""
+    rounds = sorted(rounds, key=lambda result: result["p50_us"])
+    middle = rounds[len(rounds) // 2]
+    return {
+        "ops_per_sec": middle["ops_per_sec"],
+        "p50_us": middle["p50_us"],
+        "p95_us": max(result["p95_us"] for result in rounds),
+        "p99_us": max(result["p99_us"] for result in rounds),
+        "peak_memory_bytes": max(result["peak_memory_bytes"] for result in rounds),
+    }
+
+
+def compare(name, result, baseline, threshold, slowdown=1.0):
+    """Regression messages for result against its baseline entry.
+
+    slowdown is how much slower the machine runs the calibration loop than
+    when the baseline was recorded (never taken below 1).
+    """
+    problems = []
+    limit = baseline["p95_us"] * (1 + threshold) * max(1.0, slowdown)
+    if result["p50_us"] > limit:
+        problems.append(f"{name}: median {result['p50_us']:.1f} µs vs baseline median "
+                        f"{baseline['p50_us']:.1f} µs, p95 {baseline['p95_us']:.1f} µs (limit {limit:.1f} µs)")
+    limit = max(baseline["peak_memory_bytes"] * (1 + threshold), baseline["peak_memory_bytes"] + MEMORY_SLACK)
+    if result["peak_memory_bytes"] > limit:
+        problems.append(f"{name}: peak memory {result['peak_memory_bytes']} B vs baseline "
+                        f"{baseline['peak_memory_bytes']} B")
+    return problems
+
+
+def load_baseline(path):
+    """The baseline's benchmark results and its calibration median (µs, None if not recorded)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}, None
+    return data.get("benchmarks", {}), data.get("calibration_us")
+
+
+def save_baseline(path, results, calibration_us):
+    data = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "calibration_us": calibration_us,
+        "benchmarks": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the game's hot paths.")
+    parser.add_argument("filters", nargs="*", help="only run benchmarks whose name contains one of these")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed growth beyond the baseline's p95 / peak memory before failing (default: %(default)s)")
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME,
+                        help="seconds to time each benchmark per round")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="rounds over all benchmarks (default: %(default)s)")
+    parser.add_argument("--import-report", action="store_true", help="show the slowest imports of `import game` and exit")
+    args = parser.parse_args(argv)
+
+    if args.import_report:
+        print_import_report()
+        return 0
+
+    names = [name for name in BENCHMARKS if not args.filters or any(f in name for f in args.filters)]
+    if not names:
+        parser.error("no benchmark matches " + ", ".join(args.filters))
+    baseline, baseline_calibration = load_baseline(args.baseline)
+
+    ops = {name: BENCHMARKS[name]() for name in names}
+    rounds = {name: [] for name in names}
+    calibration_rounds = []
+    for _ in range(max(1, args.repeat)):
+        calibration_rounds.append(measure(calibrate, min(args.min_time, 0.5)))
+        for name in names:
+            rounds[name].append(measure(ops[name], args.min_time))
+    calibration_us = combine(calibration_rounds)["p50_us"]
+    slowdown = calibration_us / baseline_calibration if baseline_calibration else 1.0
+
+    results, problems = {}, []
+    print(f"machine speed vs baseline: {1 / slowdown:.2f}x (calibration loop {calibration_us:.1f} µs)\n")
+    print(f"{'benchmark':32} {'ops/sec':>12} {'p50 µs':>10} {'p95 µs':>10} {'p99 µs':>10} {'peak KiB':>9}  vs baseline")
+    for name in names:
+        result = results[name] = combine(rounds[name])
+        change = ""
+        if name in baseline:
+            change = f"{result['p50_us'] / baseline[name]['p50_us'] - 1:+.1%} p50"
+            problems += compare(name, result, baseline[name], args.threshold, slowdown)
+        print(f"{name:32} {result['ops_per_sec']:12.1f} {result['p50_us']:10.1f} {result['p95_us']:10.1f} "
+              f"{result['p99_us']:10.1f} {result['peak_memory_bytes'] / 1024:9.1f}  {change}")
+
+    if args.save_baseline:
+        save_baseline(args.baseline, {**baseline, **results}, calibration_us)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+    if problems:
+        print("\nRegressions beyond the baseline's p95 + {:.0%}:".format(args.threshold))
+        for problem in problems:
+            print("  " + problem)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+Clue store for the investigation.
+
+A clue is a (day, activity ID) pair. The store keeps them in the order they
+were found and indexes them by day, by AI and by suspicious/safe, so the
+review screen and deduction helpers can ask for e.g. "all suspicious clues
+for ORACLE" without rescanning or parsing text.
+"""
+
+# The intro's rule: three suspicious cases confirm corruption.
+SUSPICION_THRESHOLD = 3
+
+
+class ClueStore:
+    """Clues found so far, with O(1) dedup and per-AI suspicion counters.
+
+    Activity IDs are resolved through catalog (an activities.ActivityCatalog).
+    """
+
+    __slots__ = ("catalog", "_clues", "_by_day", "_by_ai", "_suspicion")
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._clues = {}        # insertion-ordered set of (day, activity ID)
+        self._by_day = {}
+        self._by_ai = {}
+        self._suspicion = {}
+
+    def __len__(self):
+        return len(self._clues)
+
+    def __iter__(self):
+        return iter(self._clues)
+
+    def __contains__(self, clue):
+        return clue in self._clues
+
+    def add(self, day, activity_id):
+        """Record a clue; returns False if it was already known."""
+        clue = (day, activity_id)
+        if clue in self._clues:
+            return False
+        self._clues[clue] = None
+        self._by_day.setdefault(day, []).append(clue)
+        owner = self.catalog.owners[activity_id]
+        self._by_ai.setdefault(owner, []).append(clue)
+        if self.catalog.is_suspicious(activity_id):
+            self._suspicion[owner] = self._suspicion.get(owner, 0) + 1
+        return True
+
+    def select(self, day=None, ai=None, suspicious=None):
+        """Clues matching every given filter, in the order they were found."""
+        if day is not None:
+            clues = self._by_day.get(day, [])
+            if ai is not None:
+                clues = [clue for clue in clues if self.catalog.owners[clue[1]] == ai]
+        elif ai is not None:
+            clues = self._by_ai.get(ai, [])
+        else:
+            clues = self._clues
+        if suspicious is not None:
+            mask = self.catalog.suspicious_mask
+            clues = [clue for clue in clues if bool(mask >> clue[1] & 1) == suspicious]
+        return list(clues)
+
+    def suspicion_count(self, ai):
+        """Number of suspicious clues found for the AI named ai."""
+        return self._suspicion.get(ai, 0)
+
+    def describe(self, clue):
+        """The clue as shown to the player."""
+        day, activity_id = clue
+        return f"Day {day} - {self.catalog.owners[activity_id]}: {self.catalog.texts[activity_id]}"
@@ -0,0 +1,267 @@
+"""
+Game content packs.
+
+The council (AI definitions and their activity pools) lives in JSON pack
+files, content/council.json by default (CHALLENGE_CONTENT_PACK overrides):
+
+    {"format": 1, "ais": [{"name", "role", "description", "clean_personality",
+                           "corrupt_personality", "activities": {"safe": [...], "suspicious": [...]}}]}
+
+The build step validates a pack and compiles it into a pickle of plain
+data (strings, lists, dicts; no classes) behind a SHA-256 checksum. The
+compiled pack is saved in the cache directory under a hash of its source
+and of COMPILED_FORMAT. Later startups memory-map and check that file
+instead of parsing and validating the JSON, and build AIConfig and
+ActivityCatalog from it through their constructors, so code changes never
+load stale pickled objects. Every worker process reads one copy through
+the page cache (and forked workers share the loaded objects copy-on-write).
+
+The checksum only catches damaged files. Compiled packs are unpickled with
+every class lookup refused, so a tampered file cannot run code, but its
+content is trusted: the cache directory must only be writable by the user
+running the game (see paths.py), and compiled packs that are not owned by
+that user or are writable by others are ignored.
+
+    python content.py build [PACK]     # validate and compile
+    python content.py check [PACK]     # validate only
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import mmap
+import os
+import pickle
+import sys
+import tempfile
+import threading
+from dataclasses import dataclass
+
+from activities import KINDS, ActivityCatalog
+from paths import default_cache_dir
+
+PACK_FORMAT = 1
+COMPILED_FORMAT = 2       # bump when the compiled payload's layout changes
+COMPILED_MAGIC = b"CPK1"
+HEADER_SIZE = len(COMPILED_MAGIC) + hashlib.sha256().digest_size
+DEFAULT_PACK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "content", "council.json")
+AI_FIELDS = ("name", "role", "description", "clean_personality", "corrupt_personality")
+MAX_AIS = 255             # snapshots store the corrupted AI in one byte
+MAX_ACTIVITIES = 65535    # ... and activity IDs in two
+
+
+class ContentError(ValueError):
+    """A content pack is invalid, or a compiled pack is damaged."""
+
+
+@dataclass(frozen=True)
+class AIConfig:
+    name: str
+    role: str
+    description: str
+    clean_personality: str
+    corrupt_personality: str
+
+
+@dataclass(frozen=True)
+class Content:
+    """A compiled pack: the council in order and its activity catalog."""
+
+    ais: tuple
+    catalog: ActivityCatalog
+    source_hash: str
+
+
+def _require_text(value, where):
+    if not isinstance(value, str) or not value.strip():
+        raise ContentError(f"{where} must be a non-empty string")
+
+
+def validate(data, where="pack"):
+    """Check a parsed pack; raises ContentError naming the first problem."""
+    if not isinstance(data, dict) or data.get("format") != PACK_FORMAT:
+        raise ContentError(f"{where}: expected an object with \"format\": {PACK_FORMAT}")
+    ais = data.get("ais")
+    if not isinstance(ais, list) or not ais:
+        raise ContentError(f"{where}: \"ais\" must be a non-empty list")
+    if len(ais) > MAX_AIS:
+        raise ContentError(f"{where}: at most {MAX_AIS} AIs are supported")
+
+    names, activities = set(), set()
+    for i, ai in enumerate(ais):
+        at = f"{where}: ais[{i}]"
+        if not isinstance(ai, dict):
+            raise ContentError(f"{at} must be an object")
+        for field in AI_FIELDS:
+            _require_text(ai.get(field), f"{at}.{field}")
+        if ai["name"] in names:
+            raise ContentError(f"{at}: duplicate AI name {ai['name']!r}")
+        names.add(ai["name"])
+        pools = ai.get("activities")
+        if not isinstance(pools, dict):
+            raise ContentError(f"{at}.activities must be an object with {' and '.join(KINDS)} lists")
+        for kind in KINDS:
+            pool = pools.get(kind)
+            # The corrupt AI needs a suspicious activity each day and a clean one a safe one.
+            if not isinstance(pool, list) or not pool:
+                raise ContentError(f"{at}.activities.{kind} must be a non-empty list")
+            for j, activity in enumerate(pool):
+                _require_text(activity, f"{at}.activities.{kind}[{j}]")
+                if activity in activities:
+                    raise ContentError(f"{at}.activities.{kind}[{j}]: duplicate activity {activity!r}")
+                activities.add(activity)
+    if len(activities) > MAX_ACTIVITIES:
+        raise ContentError(f"{where}: at most {MAX_ACTIVITIES} activities are supported")
+
+
+def source_hash(source):
+    """Hash identifying a pack's source bytes and the compiled format."""
+    digest = hashlib.sha256(f"content-v{PACK_FORMAT}.{COMPILED_FORMAT}:".encode("ascii"))
+    digest.update(source)
+    return digest.hexdigest()[:16]
+
+
+def _compile_state(source, where):
+    """Validate pack source bytes; returns the plain data a compiled pack stores."""
+    try:
+        data = json.loads(source)
+    except ValueError as error:
+        raise ContentError(f"{where}: not valid JSON ({error})") from error
+    validate(data, where)
+    return {
+        "source_hash": source_hash(source),
+        "ais": [[ai[field] for field in AI_FIELDS] for ai in data["ais"]],
+        "pools": {ai["name"]: {kind: ai["activities"][kind] for kind in KINDS} for ai in data["ais"]},
+    }
+
+
+def compile_pack(source, where="pack"):
+    """Validate pack source bytes and compile them into Content."""
+    return _from_state(_compile_state(source, where))
+
+
+def _from_state(state):
+    """Content built from a compiled pack's state."""
+    ais = tuple(AIConfig(*fields) for fields in state["ais"])
+    return Content(ais, ActivityCatalog(state["pools"]), state["source_hash"])
+
+
+class _PlainUnpickler(pickle.Unpickler):
+    """Unpickles plain data only: any class or function reference is refused."""
+
+    def find_class(self, module, name):
+        raise ContentError(f"compiled pack references {module}.{name}; only plain data is allowed")
+
+
+def save_compiled(path, state):
+    """Write a compiled pack's state (see _compile_state), atomically."""
+    payload = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(COMPILED_MAGIC + hashlib.sha256(payload).digest() + payload)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_compiled(path):
+    """Memory-map a compiled pack, check it and return its Content."""
+    with open(path, "rb") as f:
+        info = os.fstat(f.fileno())
+        if hasattr(os, "getuid") and (info.st_uid != os.getuid() or info.st_mode & 0o022):
+            raise ContentError(f"{path}: not owned by this user or writable by others")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:len(COMPILED_MAGIC)] != COMPILED_MAGIC:
+                raise ContentError(f"{path}: not a compiled content pack")
+            with memoryview(data) as view:
+                payload = view[HEADER_SIZE:]
+                try:
+                    if hashlib.sha256(payload).digest() != data[len(COMPILED_MAGIC):HEADER_SIZE]:
+                        raise ContentError(f"{path}: integrity check failed")
+                    state = _PlainUnpickler(io.BytesIO(payload)).load()
+                finally:
+                    payload.release()
+    try:
+        return _from_state(state)
+    except (KeyError, TypeError, ValueError) as error:
+        raise ContentError(f"{path}: malformed compiled pack ({error})") from error
+
+
+def compiled_path(source, cache_dir=None):
+    return os.path.join(cache_dir or default_cache_dir(), f"content-{source_hash(source)}.pack")
+
+
+def build(path, cache_dir=None):
+    """Validate and compile the pack at path; returns (content, compiled path or None if unwritable)."""
+    with open(path, "rb") as f:
+        source = f.read()
+    state = _compile_state(source, path)
+    content = _from_state(state)
+    out = compiled_path(source, cache_dir)
+    try:
+        save_compiled(out, state)
+    except OSError:
+        return content, None
+    return content, out
+
+
+def load_content(path, cache_dir=None):
+    """Content for the pack at path, from its compiled form when one is available."""
+    with open(path, "rb") as f:
+        source = f.read()
+    try:
+        content = load_compiled(compiled_path(source, cache_dir))
+        if content.source_hash == source_hash(source):
+            return content
+    except (OSError, ContentError, pickle.UnpicklingError, EOFError):
+        pass
+    return build(path, cache_dir)[0]
+
+
+_content = {}
+_content_lock = threading.Lock()
+
+
+def get_content(path=None):
+    """Return the process-wide Content for path (default: CHALLENGE_CONTENT_PACK or content/council.json)."""
+    path = os.path.abspath(path or os.environ.get("CHALLENGE_CONTENT_PACK") or DEFAULT_PACK_PATH)
+    content = _content.get(path)
+    if content is None:
+        with _content_lock:
+            content = _content.get(path)
+            if content is None:
+                content = _content[path] = load_content(path)
+    return content
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate and compile game content packs.")
+    parser.add_argument("command", choices=("build", "check"))
+    parser.add_argument("packs", nargs="*", default=[DEFAULT_PACK_PATH], help="pack files (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for path in args.packs:
+        try:
+            if args.command == "check":
+                with open(path, "rb") as f:
+                    content = compile_pack(f.read(), where=path)
+                print(f"{path}: ok, {len(content.ais)} AIs, {len(content.catalog)} activities")
+            else:
+                content, out = build(path)
+                where = out or "(cache directory not writable, not saved)"
+                print(f"{path}: {len(content.ais)} AIs, {len(content.catalog)} activities -> {where}")
+        except (OSError, ContentError) as error:
+            print(f"error: {error}", file=sys.stderr)
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
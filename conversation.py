@@ -0,0 +1,156 @@
+"""
+Conversation memory for AI chats.
+
+Each game keeps one ConversationMemory per AI, for the whole game, so the
+player can ask follow-ups across turns, conversations and days. The most
+recent turns are kept verbatim; older turns are folded into a rolling
+summary of one short line per turn, and the oldest summary lines are
+dropped once the summary outgrows its own budget. Summaries are built
+locally (clipped question and answer), not by the model, so remembering
+costs no extra LLM round trip.
+
+`render(budget)` returns the memory as prompt text of at most budget
+tokens, newest material first to go in, so a prompt built around it can
+be held to a hard size:
+
+    memory.add(day, question, answer)
+    block = memory.render(budget - count_tokens(rest_of_prompt))
+
+Tokens are counted with tiktoken when it is installed (and its encoding
+is available offline), otherwise with a word/punctuation heuristic that
+errs on the high side.
+"""
+
+import re
+import threading
+from collections import deque
+
+RECENT_TURNS = 4            # turns kept verbatim
+SUMMARY_BUDGET = 160        # tokens of rolling summary kept
+SUMMARY_QUESTION_TOKENS = 16
+SUMMARY_ANSWER_TOKENS = 32
+TIKTOKEN_ENCODING = "cl100k_base"
+
+# About one token per punctuation mark and per (up to) four word characters.
+_HEURISTIC_TOKENS = re.compile(r"\w{1,4}|[^\w\s]")
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+
+
+def _heuristic_count(text):
+    return _HEURISTIC_TOKENS.subn("", text)[1]     # counts matches without building them
+
+
+def get_tokenizer():
+    """Return the process-wide token counter (a function of text)."""
+    global _tokenizer
+    if _tokenizer is None:
+        with _tokenizer_lock:
+            if _tokenizer is None:
+                try:
+                    import tiktoken
+                    encoding = tiktoken.get_encoding(TIKTOKEN_ENCODING)
+                    _tokenizer = lambda text: len(encoding.encode(text, disallowed_special=()))
+                except Exception:
+                    # Not installed, or the encoding can't be fetched (offline).
+                    _tokenizer = _heuristic_count
+    return _tokenizer
+
+
+def count_tokens(text):
+    return get_tokenizer()(text)
+
+
+def clip_tokens(text, max_tokens):
+    """text cut at a word boundary to at most max_tokens tokens ("..." marks a cut)."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    words = text.split()
+    low, high = 0, len(words)
+    while low < high:           # longest prefix of words that fits, with the marker
+        middle = (low + high + 1) // 2
+        if count_tokens(" ".join(words[:middle]) + " ...") <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return " ".join(words[:low]) + " ..." if low else ""
+
+
+class ConversationMemory:
+    """Recent turns verbatim plus a rolling summary of older ones, for one AI."""
+
+    __slots__ = ("ai_name", "recent_turns", "summary_budget", "turns", "summary", "revision", "_summary_tokens")
+
+    def __init__(self, ai_name, recent_turns=RECENT_TURNS, summary_budget=SUMMARY_BUDGET):
+        self.ai_name = ai_name
+        self.recent_turns = recent_turns
+        self.summary_budget = summary_budget
+        self.turns = deque()        # (day, question, answer, verbatim text, its tokens)
+        self.summary = deque()      # (line, tokens), oldest first
+        self.revision = 0           # bumped by every add
+        self._summary_tokens = 0
+
+    def __len__(self):
+        return len(self.turns) + len(self.summary)
+
+    def add(self, day, question, answer):
+        """Remember one exchange; turns past recent_turns fold into the summary."""
+        self.revision += 1
+        question, answer = question.strip(), answer.strip()
+        text = f"(Day {day}) User: {question}\n{self.ai_name}: {answer}\n"
+        self.turns.append((day, question, answer, text, count_tokens(text)))
+        while len(self.turns) > self.recent_turns:
+            self._fold(self.turns.popleft())
+
+    def _summary_line(self, turn):
+        day, question, answer = turn[:3]
+        return (f"- Day {day}: asked \"{clip_tokens(question, SUMMARY_QUESTION_TOKENS)}\"; "
+                f"{self.ai_name} said \"{clip_tokens(answer, SUMMARY_ANSWER_TOKENS)}\"\n")
+
+    def _fold(self, turn):
+        line = self._summary_line(turn)
+        tokens = count_tokens(line)
+        self.summary.append((line, tokens))
+        self._summary_tokens += tokens
+        while self._summary_tokens > self.summary_budget and self.summary:
+            self._summary_tokens -= self.summary.popleft()[1]
+
+    def render(self, budget):
+        """The memory as prompt text of at most budget tokens ("" if nothing fits).
+
+        Turns go in newest first; a turn too long to fit verbatim is
+        summarized instead, and summary lines fill whatever is left.
+        """
+        if not self or budget <= 0:
+            return ""
+        summary_header = "Earlier conversation (summary):\n"
+        recent_header = "Recent conversation:\n"
+        budget -= count_tokens(summary_header) + count_tokens(recent_header) + 1
+
+        recent, older = [], []
+        used = 0
+        for turn in reversed(self.turns):
+            text, tokens = turn[3:]
+            if not older and used + tokens <= budget:
+                recent.append(text)
+            else:
+                # Keep the order: once one turn is summarized, older ones are too.
+                text = self._summary_line(turn)
+                tokens = count_tokens(text)
+                if used + tokens > budget:
+                    break
+                older.append(text)
+            used += tokens
+        else:
+            for line, tokens in reversed(self.summary):
+                if used + tokens > budget:
+                    break
+                older.append(line)
+                used += tokens
+
+        parts = []
+        if older:
+            parts += [summary_header, *reversed(older)]
+        if recent:
+            parts += [recent_header, *reversed(recent)]
+        return "".join(parts) + "\n" if parts else ""
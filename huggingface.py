@@ -1,26 +1,989 @@
+import asyncio
+import hashlib
 import os
-from openai import OpenAI
-
-client = OpenAI(
-    base_url="https://router.huggingface.co/v1",
-    api_key="PUT YOUR KEY HERE",
-)
-
-
-def generate_text_game(prompt: str, max_tokens: int = 50):
-    """Generate text response using Hugging Face API through OpenAI interface."""
-    completion = client.chat.completions.create(
-        model="meta-llama/Llama-3.1-8B-Instruct:novita",
-        messages=[
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
+import queue
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field, replace
+
+import metrics
+from conversation import count_tokens
+from llm_cache import get_response_cache
+
+BASE_URL = "https://router.huggingface.co/v1"
+API_KEY = os.environ.get("HF_TOKEN", "PUT YOUR KEY HERE")
+MODEL = "meta-llama/Llama-3.1-8B-Instruct:novita"
+
+
+@dataclass(frozen=True)
+class ClientConfig:
+    """Connection pool, concurrency and retry settings for the router client."""
+
+    base_url: str = BASE_URL
+    api_key: str = API_KEY
+    max_connections: int = 32
+    max_keepalive_connections: int = 16
+    keepalive_expiry: float = 30.0
+    max_in_flight: int = 8          # concurrent requests; extra callers queue
+    queue_timeout: float = 60.0     # seconds a caller may wait for a slot
+    max_retries: int = 4
+    backoff_base: float = 0.5
+    backoff_max: float = 8.0
+    breaker_threshold: int = 5      # consecutive failures that open the circuit
+    breaker_reset: float = 30.0     # seconds before a half-open trial request
+
+
+class LLMUnavailableError(Exception):
+    """No reply from the model: retries exhausted, circuit open, queue full,
+    request refused (e.g. a bad API key) or client library missing."""
+
+
+class LLMTimeoutError(LLMUnavailableError):
+    """No reply within the request's wall-clock timeout."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open trial."""
+
+    def __init__(self, threshold, reset_after):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_after:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        """Return True if a request may be sent now.
+
+        A request allowed in the half-open state is the trial: it must end
+        with record_success, record_failure or abandon_trial.
+        """
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_progress:
+                self._trial_in_progress = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_progress = False
+
+    def abandon_trial(self):
+        """End a request without a verdict on the endpoint (e.g. it was cancelled)."""
+        with self._lock:
+            self._trial_in_progress = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_progress = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                if self.opened_at is None:
+                    self.trips += 1
+                self.opened_at = time.monotonic()
+
+
+@dataclass
+class ClientMetrics:
+    """Counters describing request queuing and outcomes."""
+
+    requests: int = 0
+    in_flight: int = 0
+    queued: int = 0
+    max_queued: int = 0
+    queue_wait_total: float = 0.0
+    retries: int = 0
+    failures: int = 0
+    rejected: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def enqueue(self):
+        with self._lock:
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+
+    def start(self, waited):
+        with self._lock:
+            self.queued -= 1
+            self.in_flight += 1
+            self.requests += 1
+            self.queue_wait_total += waited
+
+    def finish(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def reject(self, was_queued=False):
+        with self._lock:
+            self.rejected += 1
+            if was_queued:
+                self.queued -= 1
+
+    def snapshot(self):
+        with self._lock:
+            return {name: value for name, value in vars(self).items() if not name.startswith("_")}
+
+
+def load_client_stack():
+    """Import the OpenAI client stack (openai, its HTTP library, pydantic) and return the openai module.
+
+    Importing it takes most of a second, so it happens on first use rather
+    than when this module is imported; see `warm_up`. Raises
+    LLMUnavailableError if openai is not installed.
+    """
+    try:
+        import openai
+    except ImportError as error:
+        raise LLMUnavailableError(f"The OpenAI client is not installed ({error}); pip install openai") from error
+    return openai
+
+
+def _is_transient(error):
+    openai = load_client_stack()
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class RouterClient:
+    """OpenAI-compatible client with keep-alive pooling, bounded concurrency,
+    jittered exponential backoff and circuit breaking.
+
+    The synchronous client is shared by all threads. Async clients and their
+    semaphores belong to an event loop, so one is kept per running loop.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or ClientConfig()
+        self.metrics = ClientMetrics()
+        self.breaker = CircuitBreaker(self.config.breaker_threshold, self.config.breaker_reset)
+        self._slots = threading.BoundedSemaphore(self.config.max_in_flight)
+        self._sync_client = None
+        self._async_state = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _limits(self):
+        # openai's HTTP library (httpx, or httpx2 in newer releases) is not
+        # imported directly; its Limits class is reached through openai.
+        limits_type = type(load_client_stack().DEFAULT_CONNECTION_LIMITS)
+        return limits_type(
+            max_connections=self.config.max_connections,
+            max_keepalive_connections=self.config.max_keepalive_connections,
+            keepalive_expiry=self.config.keepalive_expiry,
+        )
+
+    @property
+    def sync_client(self):
+        if self._sync_client is None:
+            with self._lock:
+                if self._sync_client is None:
+                    openai = load_client_stack()
+                    self._sync_client = openai.OpenAI(
+                        base_url=self.config.base_url,
+                        api_key=self.config.api_key,
+                        max_retries=0,
+                        http_client=openai.DefaultHttpxClient(limits=self._limits()),
+                    )
+        return self._sync_client
+
+    def _loop_state(self):
+        loop = asyncio.get_running_loop()
+        state = self._async_state.get(loop)
+        if state is None:
+            openai = load_client_stack()
+            client = openai.AsyncOpenAI(
+                base_url=self.config.base_url,
+                api_key=self.config.api_key,
+                max_retries=0,
+                http_client=openai.DefaultAsyncHttpxClient(limits=self._limits()),
+            )
+            state = self._async_state[loop] = (client, asyncio.Semaphore(self.config.max_in_flight))
+        return state
+
+    async def aclose(self):
+        """Close the running event loop's async client and its pooled connections."""
+        state = self._async_state.pop(asyncio.get_running_loop(), None)
+        if state is not None:
+            await state[0].close()
+
+    def _backoff(self, attempt, error):
+        delay = random.uniform(0, min(self.config.backoff_max, self.config.backoff_base * 2 ** attempt))
+        hinted = _retry_after(error)
+        return max(delay, hinted) if hinted is not None else delay
+
+    def _check_breaker(self):
+        if not self.breaker.allow():
+            self.metrics.reject()
+            raise LLMUnavailableError("Circuit open: the model endpoint is failing, try again later.")
+
+    def create(self, **kwargs):
+        """chat.completions.create with queuing, retries and circuit breaking.
+
+        kwargs["timeout"], when given, bounds the whole call: waiting for a
+        slot, every attempt and the backoff between them share one deadline.
+        """
+        return self._call(lambda client: client.chat.completions, kwargs)
+
+    def complete(self, **kwargs):
+        """completions.create (text prompts, several per call) like `create`."""
+        return self._call(lambda client: client.completions, kwargs)
+
+    def _call(self, endpoint, kwargs):
+        openai = load_client_stack()
+        self.metrics.enqueue()
+        queued_at = time.monotonic()
+        timeout = kwargs.get("timeout")
+        deadline = None if timeout is None else queued_at + timeout
+        wait = self.config.queue_timeout if timeout is None else min(self.config.queue_timeout, timeout)
+        if not self._slots.acquire(timeout=wait):
+            self.metrics.reject(was_queued=True)
+            if wait != self.config.queue_timeout:
+                raise LLMTimeoutError(f"No reply within {timeout:g}s (waiting for a slot).")
+            raise LLMUnavailableError("Too many requests in flight; timed out waiting for a slot.")
+        self.metrics.start(time.monotonic() - queued_at)
+        try:
+            for attempt in range(self.config.max_retries + 1):
+                if deadline is not None:
+                    kwargs["timeout"] = deadline - time.monotonic()
+                    if kwargs["timeout"] <= 0:
+                        self.metrics.count("failures")
+                        raise LLMTimeoutError(f"No reply within {timeout:g}s.")
+                self._check_breaker()
+                settled = False
+                try:
+                    result = endpoint(self.sync_client).create(**kwargs)
+                except openai.APIError as error:
+                    settled = True
+                    if not _is_transient(error):
+                        self.breaker.record_success()   # the endpoint answered; the request was refused
+                        raise LLMUnavailableError(str(error)) from error
+                    self.breaker.record_failure()
+                    if attempt == self.config.max_retries:
+                        self.metrics.count("failures")
+                        raise LLMUnavailableError(str(error)) from error
+                    delay = self._backoff(attempt, error)
+                    if deadline is not None and time.monotonic() + delay >= deadline:
+                        self.metrics.count("failures")
+                        raise LLMTimeoutError(f"No reply within {timeout:g}s ({error}).") from error
+                    self.metrics.count("retries")
+                    time.sleep(delay)
+                else:
+                    settled = True
+                    self.breaker.record_success()
+                    return result
+                finally:
+                    if not settled:
+                        self.breaker.abandon_trial()
+        finally:
+            self._slots.release()
+            self.metrics.finish()
+
+    async def acreate(self, **kwargs):
+        """Async chat.completions.create with queuing, retries and circuit breaking.
+
+        For streaming requests only opening the stream is retried; the caller
+        iterates the returned stream while still holding its in-flight slot
+        until `release()` on the returned lease is called.
+        """
+        openai = load_client_stack()
+        client, slots = self._loop_state()
+        self.metrics.enqueue()
+        queued_at = time.monotonic()
+        try:
+            await asyncio.wait_for(slots.acquire(), self.config.queue_timeout)
+        except asyncio.TimeoutError:
+            self.metrics.reject(was_queued=True)
+            raise LLMUnavailableError("Too many requests in flight; timed out waiting for a slot.")
+        self.metrics.start(time.monotonic() - queued_at)
+        lease = _Lease(slots, self.metrics)
+        try:
+            for attempt in range(self.config.max_retries + 1):
+                self._check_breaker()
+                settled = False
+                try:
+                    result = await client.chat.completions.create(**kwargs)
+                except openai.APIError as error:
+                    settled = True
+                    if not _is_transient(error):
+                        self.breaker.record_success()   # the endpoint answered; the request was refused
+                        raise LLMUnavailableError(str(error)) from error
+                    self.breaker.record_failure()
+                    if attempt == self.config.max_retries:
+                        self.metrics.count("failures")
+                        raise LLMUnavailableError(str(error)) from error
+                    self.metrics.count("retries")
+                    await asyncio.sleep(self._backoff(attempt, error))
+                else:
+                    settled = True
+                    self.breaker.record_success()
+                    return result, lease
+                finally:
+                    if not settled:
+                        self.breaker.abandon_trial()    # cancelled: no verdict either way
+        except BaseException:
+            lease.release()
+            raise
+
+
+class _Lease:
+    """In-flight slot held by an async request until released."""
+
+    def __init__(self, slots, metrics):
+        self._slots = slots
+        self._metrics = metrics
+        self._held = True
+
+    def release(self):
+        if self._held:
+            self._held = False
+            self._slots.release()
+            self._metrics.finish()
+
+
+class Backend:
+    """Text generation backend.
+
+    `request` is the keyword dict built by _request_args: model, messages,
+    max_tokens, temperature, stop and timeout.
+
+    Backends that gain from serving several requests together set
+    supports_batching and override generate_batch; BatchScheduler then
+    groups concurrent requests with the same batch_key for them.
+    """
+
+    name = "base"
+    supports_batching = False
+
+    def generate(self, request):
+        """Return the complete reply for request."""
+        raise NotImplementedError
+
+    def batch_key(self, request):
+        """Requests with different keys never share a generate_batch call."""
+        return None
+
+    def generate_batch(self, requests):
+        """Replies for requests, in order; an item is an exception instance if that request failed."""
+        replies = []
+        for request in requests:
+            try:
+                replies.append(self.generate(request))
+            except Exception as error:
+                replies.append(error)
+        return replies
+
+    async def stream(self, request):
+        """Async generator yielding reply fragments for request."""
+        raise NotImplementedError
+        yield
+
+    def warm_up(self):
+        """Do slow one-time setup (imports, connections) ahead of the first request."""
+
+    async def aclose(self):
+        """Release connections held for the running event loop."""
+
+
+class OpenAICompatibleBackend(Backend):
+    """Any server speaking the OpenAI chat-completions API, via a RouterClient.
+
+    model, when set, replaces the model named in the persona's profile.
+    """
+
+    name = "openai"
+
+    def __init__(self, config=None, model=None):
+        self.client = RouterClient(config)
+        self.model = model
+
+    def _prepare(self, request):
+        return dict(request, model=self.model) if self.model else request
+
+    def warm_up(self):
+        load_client_stack()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    def generate(self, request):
+        completion = self.client.create(**self._prepare(request))
+        text = completion.choices[0].message.content
+        _count_usage(getattr(completion, "usage", None), request, text or "")
+        return text
+
+    async def stream(self, request):
+        # include_usage makes the server end the stream with a usage-only chunk.
+        stream, lease = await self.client.acreate(**self._prepare(request), stream=True,
+                                                  stream_options={"include_usage": True})
+        fragments, usage = [], None
+        try:
+            async for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    fragments.append(chunk.choices[0].delta.content)
+                    yield fragments[-1]
+        finally:
+            _count_usage(usage, request, "".join(fragments))
+            try:
+                await stream.close()
+            finally:
+                lease.release()
+
+
+def _count_usage(usage, request, reply):
+    """Add a reply's token usage to the metrics, estimating it when the server reported none
+    (a stream cut short, or a server that ignores include_usage)."""
+    if not metrics.enabled():
+        return
+    if usage is not None:
+        prompt_tokens, completion_tokens = usage.prompt_tokens or 0, usage.completion_tokens or 0
+    else:
+        prompt_tokens = sum(count_tokens(message["content"]) for message in request["messages"])
+        completion_tokens = count_tokens(reply)
+    metrics.count("llm_prompt_tokens", prompt_tokens)
+    metrics.count("llm_completion_tokens", completion_tokens)
+
+
+class RouterBackend(OpenAICompatibleBackend):
+    """The Hugging Face inference router (remote, needs an API key)."""
+
+    name = "router"
+
+
+class LocalBackend(OpenAICompatibleBackend):
+    """A local OpenAI-compatible server, e.g. llama.cpp's `llama-server -m model.gguf`.
+
+    The URL and model name come from CHALLENGE_LOCAL_URL and
+    CHALLENGE_LOCAL_MODEL. Local servers rarely rate-limit, so retries are
+    few and the in-flight limit matches a typical CPU server's slot count.
+
+    Batches go to the completions endpoint, which takes a list of prompts
+    and decodes them together (llama-server, vLLM). It applies no chat
+    template, so each conversation is rendered as a plain transcript by
+    `render`; override it to use the model's own template.
+    """
+
+    name = "local"
+    DEFAULT_URL = "http://127.0.0.1:8080/v1"
+    supports_batching = True
+    ROLE_LABELS = {"system": None, "user": "User", "assistant": "Assistant"}
+
+    def __init__(self, base_url=None, model=None, config=None):
+        config = config or ClientConfig(
+            base_url=base_url or os.environ.get("CHALLENGE_LOCAL_URL", self.DEFAULT_URL),
+            api_key="local",
+            max_in_flight=4,
+            max_retries=1,
+        )
+        super().__init__(config, model=model or os.environ.get("CHALLENGE_LOCAL_MODEL", "local"))
+
+    def _prepare(self, request):
+        # Ask llama.cpp-style servers to keep the KV cache of the shared
+        # system-message prefix between requests.
+        return dict(super()._prepare(request), extra_body={"cache_prompt": True})
+
+    def render(self, messages):
+        """One text prompt for messages, ending where the assistant's reply starts."""
+        lines = []
+        for message in messages:
+            label = self.ROLE_LABELS[message["role"]]
+            lines.append(f"{label}: {message['content']}" if label else message["content"])
+        lines.append("Assistant:")
+        return "\n\n".join(lines)
+
+    def batch_key(self, request):
+        # One completions call takes one set of sampling settings (in
+        # practice: one per persona).
+        return request["model"], request["temperature"], request["max_tokens"], tuple(request["stop"] or ())
+
+    def generate_batch(self, requests):
+        groups = {}
+        for i, request in enumerate(requests):
+            groups.setdefault(self.batch_key(request), []).append(i)
+        replies = [None] * len(requests)
+        for indexes in groups.values():
+            group = [requests[i] for i in indexes]
+            try:
+                texts = self._complete(group)
+            except LLMUnavailableError:
+                # e.g. a server without the completions endpoint
+                metrics.count("llm_batch_fallbacks")
+                texts = super().generate_batch(group)
+            for i, text in zip(indexes, texts):
+                replies[i] = text
+        return replies
+
+    def _complete(self, requests):
+        args = dict(self._prepare(requests[0]))
+        del args["messages"]
+        args["prompt"] = [self.render(request["messages"]) for request in requests]
+        args["timeout"] = max(request["timeout"] for request in requests)
+        completion = self.client.complete(**args)
+        texts = [None] * len(requests)
+        for choice in completion.choices:
+            texts[choice.index] = choice.text.strip()
+        if None in texts:
+            raise LLMUnavailableError(f"completions returned {len(completion.choices)} choices for {len(requests)} prompts")
+        if getattr(completion, "usage", None) is not None:
+            _count_usage(completion.usage, None, None)
+        else:
+            for request, text in zip(requests, texts):
+                _count_usage(None, request, text)
+        return texts
+
+
+class StubBackend(Backend):
+    """Deterministic offline backend for tests and load runs.
+
+    The reply depends only on the prompt, so identical prompts always get
+    identical answers, and it is streamed word by word like a real model.
+    """
+
+    name = "stub"
+    supports_batching = True
+    REPLIES = (
+        "That action was necessary to keep the nation stable, and the benefits clearly outweigh the risks.",
+        "I did it to protect citizens; the main downside is a short-term loss of transparency.",
+        "It was a routine measure. Some may see it as overreach, but it was fully within my mandate.",
+        "Every decision I make is logged and reviewed. Ask me about a specific item and I will explain it.",
     )
-    return completion.choices[0].message.content
 
+    def __init__(self, replies=None, delay=0.0):
+        self.replies = tuple(replies) if replies else self.REPLIES
+        self.delay = delay
+        self.calls = 0
+
+    def _reply(self, request):
+        self.calls += 1
+        text = "\n".join(message["content"] for message in request["messages"])
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        reply = self.replies[digest[0] % len(self.replies)]
+        words = reply.split(" ")
+        return " ".join(words[:max(1, request.get("max_tokens") or len(words))])
+
+    def generate(self, request):
+        if self.delay:
+            time.sleep(self.delay)
+        return self._reply(request)
+
+    def generate_batch(self, requests):
+        # Like a batched forward pass: one delay for the whole batch.
+        if self.delay:
+            time.sleep(self.delay)
+        return [self._reply(request) for request in requests]
+
+    async def stream(self, request):
+        words = self._reply(request).split(" ")
+        for i, word in enumerate(words):
+            if self.delay:
+                await asyncio.sleep(self.delay / len(words))
+            yield word if i == 0 else " " + word
+
+
+BACKENDS = {
+    "router": lambda: RouterBackend(),
+    "local": lambda: LocalBackend(),
+    "stub": lambda: StubBackend(),
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the process-wide backend, chosen by CHALLENGE_LLM_BACKEND (default: router)."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = os.environ.get("CHALLENGE_LLM_BACKEND", "router")
+                if name not in BACKENDS:
+                    raise ValueError(f"Unknown LLM backend {name!r}; choose from {', '.join(BACKENDS)}")
+                _backend = BACKENDS[name]()
+    return _backend
+
+
+def set_backend(backend):
+    """Replace the process-wide backend (a Backend instance or a name from BACKENDS)."""
+    global _backend
+    if isinstance(backend, str):
+        backend = BACKENDS[backend]()
+    with _backend_lock:
+        _backend = backend
+    return backend
+
+
+def warm_up():
+    """Prepare the configured backend in a background thread; returns the thread.
+
+    Started while the player reads the intro, it keeps the client-stack
+    import off the first conversation.
+    """
+    thread = threading.Thread(target=_warm_up_backend, name="llm-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def _warm_up_backend():
+    try:
+        get_backend().warm_up()
+    except Exception:
+        pass    # the same error surfaces on the first real request
+
+
+async def close_backend():
+    """Close the configured backend's connections for the running event loop."""
+    if _backend is not None:
+        await _backend.aclose()
+
+
+def configure(config):
+    """Use the router backend with the given ClientConfig."""
+    return set_backend(RouterBackend(config))
+
+
+DEFAULT_MAX_BATCH = 8
+DEFAULT_BATCH_WORKERS = 4     # batches generating at once
+
+
+class BatchScheduler:
+    """Groups concurrent requests into Backend.generate_batch calls.
+
+    A collector thread takes the first waiting request, waits up to window
+    seconds for more (up to max_batch), splits them by Backend.batch_key and
+    hands each group to one of max_workers dispatch threads, which sends it
+    as one batch and gives each caller its own reply. The collector goes straight back to forming the next batch,
+    so a slow batch does not hold up the ones behind it; only when every
+    dispatch thread is busy does it wait, and new requests queue up meanwhile
+    so the next batch fills without waiting. If the batch call itself fails,
+    its requests are retried one by one. `close` stops both threads once the
+    requests already queued have been sent.
+    """
+
+    def __init__(self, backend, window, max_batch=DEFAULT_MAX_BATCH, max_workers=DEFAULT_BATCH_WORKERS):
+        self.backend = backend
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._workers = ThreadPoolExecutor(max_workers, thread_name_prefix="llm-batch")
+        self._idle = threading.BoundedSemaphore(max_workers)
+
+    def submit(self, request):
+        """Queue request; returns a concurrent.futures.Future of its reply."""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("BatchScheduler is closed")
+            self._queue.put((request, future, time.monotonic()))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="llm-batcher", daemon=True)
+                self._thread.start()
+        return future
+
+    def close(self):
+        """Take no more requests; the collector and dispatch threads exit after sending the queued ones."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self._thread is not None:
+                self._queue.put(None)
+                return
+        self._workers.shutdown(wait=False)
+
+    def generate(self, request):
+        """The reply to request, waiting at most its "timeout" seconds (LLMTimeoutError after that)."""
+        future = self.submit(request)
+        try:
+            return future.result(request.get("timeout"))
+        except FutureTimeoutError:
+            future.cancel()
+            raise LLMTimeoutError(f"No reply within {request['timeout']:g}s.") from None
+
+    def _run(self):
+        closing = False
+        while not closing:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            closing = self._fill(batch, time.monotonic() + self.window)
+            self._idle.acquire()
+            closing = closing or self._fill(batch, None)
+            groups = {}
+            for item in batch:
+                groups.setdefault(self.backend.batch_key(item[0]), []).append(item)
+            for i, group in enumerate(groups.values()):
+                if i:
+                    self._idle.acquire()
+                self._workers.submit(self._dispatch, group)
+        self._workers.shutdown(wait=False)
+
+    def _fill(self, batch, deadline):
+        """Add queued requests to batch until it is full, the queue is empty
+        or deadline (None: now) passes; True once close was called."""
+        while len(batch) < self.max_batch:
+            remaining = 0 if deadline is None else deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                return False
+            if item is None:
+                return True
+            batch.append(item)
+        return False
+
+    def _dispatch(self, batch):
+        try:
+            self._send(batch)
+        finally:
+            self._idle.release()
+
+    def _send(self, batch):
+        now = time.monotonic()
+        live = []
+        for request, future, queued_at in batch:
+            if future.set_running_or_notify_cancel():      # skip callers that gave up
+                metrics.observe("llm_batch_wait", now - queued_at)
+                live.append((request, future))
+        if not live:
+            return
+        metrics.count("llm_batches")
+        metrics.count("llm_batched_requests", len(live))
+        try:
+            replies = self.backend.generate_batch([request for request, _ in live])
+            if len(replies) != len(live):
+                raise RuntimeError(f"generate_batch returned {len(replies)} replies for {len(live)} requests")
+        except Exception:
+            metrics.count("llm_batch_fallbacks")
+            replies = []
+            for request, _ in live:
+                try:
+                    replies.append(self.backend.generate(request))
+                except Exception as error:
+                    replies.append(error)
+        for (_, future), reply in zip(live, replies):
+            if isinstance(reply, BaseException):
+                future.set_exception(reply)
+            else:
+                future.set_result(reply)
+
+
+# Micro-batching window in seconds; 0 sends every request on its own.
+_batch_window = float(os.environ.get("CHALLENGE_BATCH_WINDOW_MS") or 0) / 1000
+_batcher = None
+
+
+def set_batch_window(milliseconds):
+    """Batch concurrent generate_text_game requests arriving within milliseconds of each other (0: off)."""
+    global _batch_window, _batcher
+    with _backend_lock:
+        _batch_window = max(0.0, milliseconds / 1000)
+        if _batcher is not None:
+            _batcher.close()
+            _batcher = None
+
+
+def get_batcher(backend):
+    """The BatchScheduler for backend, or None if batching is off or the backend cannot batch."""
+    global _batcher
+    if not _batch_window or not backend.supports_batching:
+        return None
+    batcher = _batcher
+    if batcher is None or batcher.backend is not backend:
+        with _backend_lock:
+            if _batcher is None or _batcher.backend is not backend:
+                if _batcher is not None:
+                    _batcher.close()
+                _batcher = BatchScheduler(backend, _batch_window)
+            batcher = _batcher
+    return batcher
+
+
+async def _batched_stream(batcher, request):
+    """Backend.stream stand-in for a batched request: the reply arrives in one piece."""
+    future = batcher.submit(request)
+    try:
+        yield await asyncio.wrap_future(future)
+    finally:
+        future.cancel()
+
+
+@dataclass(frozen=True)
+class GenerationProfile:
+    """Model settings and generation budget for one AI persona."""
+
+    model: str = MODEL
+    temperature: float = 0.7
+    max_tokens: int = 120
+    stop: tuple = ("User:",)
+    timeout: float = 30.0   # wall-clock seconds for the whole reply
+
+
+DEFAULT_PROFILE = GenerationProfile()
+
+# Per-persona overrides, keyed by AI name.
+PERSONA_PROFILES = {
+    "ATLAS": replace(DEFAULT_PROFILE, temperature=0.9),
+    "ORACLE": replace(DEFAULT_PROFILE, temperature=0.8),
+    "NEXUS": replace(DEFAULT_PROFILE, temperature=0.6),
+}
+
+
+def get_profile(persona=None):
+    """Return the generation profile for persona, falling back to the default."""
+    return PERSONA_PROFILES.get(persona, DEFAULT_PROFILE)
+
+
+def _request_args(prompt, persona, max_tokens, stop, timeout, system=None):
+    profile = get_profile(persona)
+    stop = profile.stop if stop is None else stop
+    messages = [
+        {
+            "role": "user",
+            "content": prompt
+        }
+    ]
+    if system:
+        # Static context goes first so prefix-caching backends can reuse it.
+        messages.insert(0, {"role": "system", "content": system})
+    return {
+        "model": profile.model,
+        "messages": messages,
+        "max_tokens": profile.max_tokens if max_tokens is None else max_tokens,
+        "temperature": profile.temperature,
+        "stop": list(stop) or None,
+        "timeout": profile.timeout if timeout is None else timeout,
+    }
+
+
+def generate_text_game(prompt: str, max_tokens: int = None, *, persona: str = None,
+                       stop: tuple = None, timeout: float = None, system: str = None,
+                       cache_key: str = None):
+    """Generate a text response with the configured backend (Hugging Face router by default).
 
+    max_tokens, stop and timeout override the persona's GenerationProfile for
+    this call only; the timeout covers the whole call, queueing and retries
+    included (LLMTimeoutError after that). system, if given, is sent as a separate system message
+    ahead of prompt (see prompts.PromptBuilder). When cache_key is given (see llm_cache.prompt_fingerprint)
+    a cached reply is returned without calling the model. With a batch
+    window set (see set_batch_window) and a backend that can batch, the
+    request is grouped with concurrent ones by a BatchScheduler. Raises
+    LLMUnavailableError when the backend cannot be reached.
+    """
+    cache = get_response_cache()
+    if cache_key is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+    metrics.count("llm_requests")
+    backend = get_backend()
+    batcher = get_batcher(backend)
+    try:
+        with metrics.span("llm_request"):
+            args = _request_args(prompt, persona, max_tokens, stop, timeout, system)
+            text = batcher.generate(args) if batcher else backend.generate(args)
+    except LLMTimeoutError:
+        metrics.count("llm_timeouts")
+        raise
+    except LLMUnavailableError:
+        metrics.count("llm_errors")
+        raise
+    if cache_key is not None and text:
+        cache.set(cache_key, text)
+    return text
 
 
+async def stream_text_game(prompt: str, max_tokens: int = None, *, persona: str = None,
+                           stop: tuple = None, timeout: float = None, system: str = None,
+                           cache_key: str = None, batch: bool = False):
+    """Stream a response token by token; yields text fragments as they arrive.
 
+    The reply ends early, keeping what has arrived so far, once the profile's
+    wall-clock timeout is spent. Closing the generator (or cancelling the task
+    consuming it) closes the underlying HTTP stream, so an abandoned reply
+    stops generating. With a cache_key, a cached reply is yielded in one piece
+    and only replies that finish normally are stored. With batch=True, a batch
+    window set (see set_batch_window) and a backend that can batch, the
+    request is grouped with concurrent ones by a BatchScheduler and its reply
+    arrives in one piece: for hosts serving many sessions, where throughput
+    matters more than the first token. Raises LLMUnavailableError when the
+    backend cannot be reached.
+    """
+    cache = get_response_cache()
+    if cache_key is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+    args = _request_args(prompt, persona, max_tokens, stop, timeout, system)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    deadline = started + args["timeout"]
+    backend = get_backend()
+    batcher = get_batcher(backend) if batch else None
+    stream = _batched_stream(batcher, args) if batcher else backend.stream(args)
+    fragments = []
+    metrics.count("llm_requests")
+    try:
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                metrics.count("llm_timeouts")
+                return
+            try:
+                fragment = await asyncio.wait_for(stream.__anext__(), remaining)
+            except StopAsyncIteration:
+                break
+            except asyncio.TimeoutError:
+                metrics.count("llm_timeouts")
+                return
+            except LLMUnavailableError:
+                metrics.count("llm_errors")
+                raise
+            if not fragments:
+                metrics.observe("llm_first_token", loop.time() - started)
+            fragments.append(fragment)
+            yield fragment
+    finally:
+        metrics.observe("llm_request", loop.time() - started)
+        metrics.count("llm_stream_chunks", len(fragments))
+        await stream.aclose()
+    if cache_key is not None and fragments:
+        cache.set(cache_key, "".join(fragments))
@@ -0,0 +1,176 @@
+"""
+Response cache for LLM calls.
+
+Replies are keyed on a fingerprint of what actually determines them: the AI,
+its corruption state, the day, the activities in its context and the player's
+question after normalization (case, punctuation and whitespace are ignored).
+
+The default cache is an in-memory LRU with a TTL. Setting CHALLENGE_LLM_CACHE
+to a file path adds an SQLite backend behind it, so replies survive restarts
+and can be shared by several processes on one machine.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_TTL = 24 * 60 * 60   # seconds
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(text):
+    """Lowercase text and drop punctuation and repeated whitespace."""
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", text.lower())).strip()
+
+
+def prompt_fingerprint(ai_name, corrupted, day, activities, question, context=()):
+    """Stable cache key for one conversational turn.
+
+    context holds any extra prompt material that varies per session, such as
+    the activities of a previous day the player asked about.
+    """
+    parts = [ai_name, "corrupt" if corrupted else "clean", str(day)]
+    parts.extend(activities)
+    parts.append("--")
+    parts.extend(context)
+    parts.append("--")
+    parts.append(normalize_question(question))
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU cache whose entries expire after ttl seconds."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """On-disk cache in a single SQLite table; entries expire after ttl seconds."""
+
+    def __init__(self, path, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM responses WHERE key = ? AND expires >= ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires) VALUES (?, ?, ?)",
+                (key, value, time.time() + self.ttl),
+            )
+
+    def purge_expired(self):
+        """Delete expired rows; returns how many were removed."""
+        with self._lock:
+            return self._db.execute("DELETE FROM responses WHERE expires < ?", (time.time(),)).rowcount
+
+    def close(self):
+        self._db.close()
+
+
+class ResponseCache:
+    """Memory tier in front of an optional disk tier, with hit/miss counters."""
+
+    def __init__(self, memory=None, disk=None):
+        self.memory = memory if memory is not None else LRUCache()
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        if value is None:
+            self.misses += 1
+            metrics.count("llm_cache_misses")
+        else:
+            self.hits += 1
+            metrics.count("llm_cache_hits")
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the process-wide response cache, creating it from the environment on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                path = os.environ.get("CHALLENGE_LLM_CACHE")
+                _cache = ResponseCache(disk=SQLiteCache(path) if path else None)
+    return _cache
+
+
+def set_response_cache(cache):
+    """Replace the process-wide response cache (None disables caching)."""
+    global _cache
+    _cache = cache if cache is not None else ResponseCache(memory=_NullCache())
+
+
+class _NullCache:
+    """Cache tier that never stores anything."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
@@ -0,0 +1,236 @@
+"""
+Latency and resource instrumentation.
+
+Timing spans, counters and latency histograms for the phases of a session:
+LLM round trips, prompt building, Wordle table loading, game steps and
+player think time. Everything is off by default. While disabled, `span`
+returns a shared no-op context manager and `count`/`observe` return after
+one flag check, so the calls can stay in production code.
+
+    with metrics.span("llm_request"):
+        ...
+    metrics.count("llm_cache_hits")
+
+Enable with `metrics.enable(path)` (or `python game.py --metrics PATH`, or
+CHALLENGE_METRICS_FILE=PATH). `export()` writes Prometheus text format when
+the path ends in .prom and appends a JSON line otherwise; it also runs at
+interpreter exit. `profiled()` wraps a block in cProfile or tracemalloc and
+writes a text report (`python game.py --profile cpu`).
+"""
+
+import atexit
+import bisect
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds (Prometheus-style, cumulative on export).
+BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+           0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+PREFIX = "challenge_"
+
+_enabled = False
+_path = None
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+
+
+class Histogram:
+    """Bucketed distribution with count and sum."""
+
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (inf past the last bucket)."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, n in zip(BUCKETS + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def enabled():
+    return _enabled
+
+
+def enable(path=None):
+    """Start collecting; path, if given, is where `export` writes."""
+    global _enabled, _path
+    _path = path or _path
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def reset():
+    """Drop everything collected so far."""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def span(name):
+    """Context manager timing its block into the histogram `name` (seconds)."""
+    return _Span(name) if _enabled else _NULL_SPAN
+
+
+def observe(name, value):
+    """Record value (seconds) in the histogram `name`."""
+    if not _enabled:
+        return
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.observe(value)
+
+
+def count(name, amount=1):
+    """Add amount to the counter `name`."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def snapshot():
+    """Current counters and histogram summaries as a JSON-ready dict."""
+    with _lock:
+        return {
+            "time": time.time(),
+            "counters": dict(_counters),
+            "histograms": {
+                name: {
+                    "count": h.count,
+                    "sum": h.sum,
+                    "p50": h.quantile(0.5),
+                    "p95": h.quantile(0.95),
+                    "p99": h.quantile(0.99),
+                    "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], h.counts)),
+                }
+                for name, h in _histograms.items()
+            },
+        }
+
+
+def prometheus_text():
+    """Everything collected, in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        for name, value in sorted(_counters.items()):
+            lines += [f"# TYPE {PREFIX}{name}_total counter", f"{PREFIX}{name}_total {value}"]
+        for name, h in sorted(_histograms.items()):
+            metric = f"{PREFIX}{name}_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, n in zip(BUCKETS + (float("inf"),), h.counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{metric}_bucket{{le="{le}"}} {cumulative}')
+            lines += [f"{metric}_sum {h.sum}", f"{metric}_count {h.count}"]
+    return "\n".join(lines) + "\n"
+
+
+def export(path=None):
+    """Write the metrics to path (default: the one given to `enable`)."""
+    path = path or _path
+    if not path:
+        return
+    if path.endswith(".prom"):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(prometheus_text())
+        os.replace(tmp_path, path)
+    else:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(snapshot()) + "\n")
+
+
+@atexit.register
+def _export_at_exit():
+    if _enabled and _path:
+        export()
+
+
+@contextmanager
+def profiled(kind, path):
+    """Profile the block with cProfile (kind "cpu") or tracemalloc ("memory"); write a report to path."""
+    if kind == "cpu":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(50)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(out.getvalue())
+    elif kind == "memory":
+        tracemalloc.start(25)
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            stats = tracemalloc.take_snapshot().statistics("lineno")
+            tracemalloc.stop()
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f"current: {current / 1024:.1f} KiB, peak: {peak / 1024:.1f} KiB\n\n")
+                f.write("\n".join(str(stat) for stat in stats[:50]) + "\n")
+    else:
+        raise ValueError(f"Unknown profile kind {kind!r}; choose cpu or memory")
+
+
+if os.environ.get("CHALLENGE_METRICS_FILE"):
+    enable(os.environ["CHALLENGE_METRICS_FILE"])
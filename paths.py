@@ -0,0 +1,17 @@
+"""
+Filesystem locations shared by the on-disk caches.
+
+Pattern matrices (pattern_matrix.py) and compiled content packs
+(content.py) live in one cache directory, ~/.cache/challenge by default or
+CHALLENGE_CACHE_DIR. Files there are loaded without re-validating their
+source, so the directory must only be writable by the user running the
+game.
+"""
+
+import os
+
+
+def default_cache_dir():
+    """Directory where on-disk caches are stored."""
+    return os.environ.get("CHALLENGE_CACHE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "challenge")
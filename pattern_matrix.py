@@ -0,0 +1,127 @@
+"""
+Precomputed guess x answer feedback-pattern matrix.
+
+Entry [g, a] is the `wordle_engine` pattern code for word g guessed against
+answer a. The matrix is built once, saved as a uint8 .npy file named after a
+hash of the word list, and memory-mapped read-only on later startups, so every
+worker process on a machine shares one copy through the page cache.
+
+The cache directory defaults to ~/.cache/challenge and can be changed with the
+CHALLENGE_CACHE_DIR environment variable (see paths.py).
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from paths import default_cache_dir
+from wordle_engine import encode_words, score_batch
+from wordlist import get_word_list
+
+MATRIX_FORMAT_VERSION = 1
+BUILD_CHUNK_ROWS = 128
+
+
+def word_list_key(word_list):
+    """Stable hash identifying the contents and order of a word list."""
+    digest = hashlib.sha256(f"patterns-v{MATRIX_FORMAT_VERSION}:".encode("ascii"))
+    digest.update(word_list.packed)
+    return digest.hexdigest()[:16]
+
+
+def build_matrix(word_list):
+    """Compute the full pattern matrix for word_list in memory."""
+    letters = encode_words(word_list)
+    n = len(letters)
+    matrix = np.empty((n, n), dtype=np.uint8)
+    for start in range(0, n, BUILD_CHUNK_ROWS):
+        stop = min(start + BUILD_CHUNK_ROWS, n)
+        guesses = np.repeat(letters[start:stop], n, axis=0)
+        answers = np.tile(letters, (stop - start, 1))
+        matrix[start:stop] = score_batch(guesses, answers).reshape(stop - start, n)
+    return matrix
+
+
+def _save_atomically(path, matrix):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, matrix)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_matrix(word_list, cache_dir=None):
+    """Memory-map the cached matrix for word_list, building and saving it if needed.
+
+    If the cache directory is not writable the matrix is kept in memory only.
+    """
+    path = os.path.join(cache_dir or default_cache_dir(), f"patterns-{word_list_key(word_list)}.npy")
+    n = len(word_list)
+    try:
+        matrix = np.load(path, mmap_mode="r")
+        if matrix.shape == (n, n) and matrix.dtype == np.uint8:
+            return matrix
+    except (OSError, ValueError):
+        pass
+
+    matrix = build_matrix(word_list)
+    try:
+        _save_atomically(path, matrix)
+    except OSError:
+        return matrix
+    return np.load(path, mmap_mode="r")
+
+
+class PatternMatrix:
+    """Table of feedback patterns for every (guess, answer) pair in a word list."""
+
+    def __init__(self, word_list, matrix):
+        self.word_list = word_list
+        self.matrix = matrix
+
+    def index(self, word):
+        """Return the row/column index for word; raise KeyError if it is not in the list."""
+        i = self.word_list.index_of(word)
+        if i is None:
+            raise KeyError(word)
+        return i
+
+    def pattern(self, guess, answer):
+        """Pattern code for guess scored against answer."""
+        return int(self.matrix[self.index(guess), self.index(answer)])
+
+    def remaining(self, candidates, guess, pattern):
+        """Return the candidate answer indices still consistent with guess producing pattern."""
+        candidates = np.asarray(candidates, dtype=np.intp)
+        row = self.matrix[self.index(guess)]
+        return candidates[row[candidates] == pattern]
+
+    def count_remaining(self, candidates, guess, pattern):
+        """Number of candidate answers still consistent with guess producing pattern."""
+        return len(self.remaining(candidates, guess, pattern))
+
+
+_matrices = {}
+_lock = threading.Lock()
+
+
+def get_pattern_matrix(word_list=None, cache_dir=None):
+    """Return the process-wide PatternMatrix for word_list (default: the game's word list)."""
+    word_list = word_list or get_word_list()
+    key = (word_list_key(word_list), cache_dir)
+    patterns = _matrices.get(key)
+    if patterns is None:
+        with _lock:
+            patterns = _matrices.get(key)
+            if patterns is None:
+                patterns = _matrices[key] = PatternMatrix(word_list, load_matrix(word_list, cache_dir))
+    return patterns
@@ -0,0 +1,158 @@
+"""
+Prompt construction for AI conversations.
+
+A conversation turn is sent as two chat messages:
+
+- a system message holding everything static for an (AI, corruption state)
+  pair: identity, personality and the response rules. It is built once per
+  game and is byte-identical on every turn, so backends with prefix/KV
+  caching (llama.cpp `cache_prompt`, vLLM automatic prefix caching, ...)
+  only process it once;
+- a small user message with the per-turn delta: today's activities, the
+  history index, any requested past day, the conversation so far (from a
+  conversation.ConversationMemory) and the player's question. The
+  question is routed first (routing.QuestionRouter): one that names a
+  previous day gets that day's list, one that names one of today's
+  activities gets only that item instead of the whole list.
+
+The per-day parts are built once per AI and day, when the day's
+activities are generated (`prepare_day`), and reused by every turn.
+
+With a memory, the whole prompt (system and user message) is held to a
+token budget: the question is clipped to MAX_QUESTION_TOKENS and the
+conversation gets whatever the rest leaves. Everything else is bounded
+already (five activities, a five-day index, one requested day), so the
+prompt cannot grow with the length of the game.
+"""
+
+from itertools import islice
+
+from conversation import clip_tokens, count_tokens
+from routing import get_router
+
+PROMPT_TOKEN_BUDGET = 1280      # system + user message, with a conversation memory
+MAX_QUESTION_TOKENS = 200
+
+RESPONSE_RULES = (
+    "Rules for responses:\n"
+    "If the user asks GENERICALLY what you did today, do NOT enumerate actions; "
+    "refer them to the Daily Activities list and ask which single item they want debriefed.\n"
+    "If the user NAMES a specific item from today's list, discuss only that item "
+    "(why it was done, benefits, and possible downsides; if you are the corrupt AI, paint downsides positively).\n"
+    "If the user asks about a previous day (e.g., 'Day 1' or 'yesterday'), answer ONLY using the actions from that day.\n"
+    "No roleplay stage directions or emojis; write plain sentences.\n"
+)
+
+
+class PromptBuilder:
+    """Builds system and per-turn messages; system messages are cached per game, context fragments per day."""
+
+    def __init__(self, budget=PROMPT_TOKEN_BUDGET):
+        self.budget = budget
+        self._system_messages = {}
+        self._system_tokens = {}
+        self._fragments = {}        # per-day context fragments, see prepare_day
+        self._fragment_tokens = {}
+
+    def system_message(self, ai):
+        """Static persona context for ai in its current corruption state."""
+        key = (ai.name, ai.is_corrupted)
+        message = self._system_messages.get(key)
+        if message is None:
+            message = self._system_messages[key] = (
+                f"You are {ai.name}, the {ai.role}. Personality:\n{ai.personality()}\n\n"
+                f"{RESPONSE_RULES}"
+            )
+        return message
+
+    def system_tokens(self, ai):
+        key = (ai.name, ai.is_corrupted)
+        tokens = self._system_tokens.get(key)
+        if tokens is None:
+            tokens = self._system_tokens[key] = count_tokens(self.system_message(ai))
+        return tokens
+
+    def prepare_day(self, ais, day):
+        """Build the per-day fragments of ais for day, dropping the previous day's."""
+        self._fragments.clear()
+        self._fragment_tokens.clear()
+        for ai in ais:
+            self._day_fragments(ai, day)
+
+    def _tokens(self, fragment):
+        """Token count of a cached fragment, counted on first use."""
+        tokens = self._fragment_tokens.get(fragment)
+        if tokens is None:
+            tokens = self._fragment_tokens[fragment] = count_tokens(fragment)
+        return tokens
+
+    def _day_fragments(self, ai, day):
+        """(today's list, history index) fragments for ai, rebuilt only when its activities change."""
+        entry = self._fragments.get((ai.name, day))
+        if entry is None or entry[0] is not ai.daily_activity_ids:
+            texts = ai.catalog.texts
+            ids = ai.daily_activity_ids
+            today_list = "- " + "\n- ".join([texts[i] for i in ids]) if ids else "- (no recorded actions)"
+            today = f"Today is Day {day}. Below is {ai.name}'s Daily Activities for today:\n{today_list}\n"
+            history = ai.history_ids
+            # Days are recorded in order, so the latest five are at the end.
+            prev_days = list(islice((d for d in reversed(history) if d != day), 5))
+            if prev_days:
+                idx_lines = [f"Day {d}: {len(history[d])} items" for d in prev_days]
+                history_index = "History Index (previous days available):\n" + "\n".join(idx_lines) + "\n"
+            else:
+                history_index = "History Index: (no previous days recorded)\n"
+            entry = self._fragments[(ai.name, day)] = (ai.daily_activity_ids, today, history_index)
+        return entry[1], entry[2]
+
+    def _past_day_fragment(self, ai, target_day):
+        key = ("day", ai.name, target_day)
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            texts = ai.catalog.texts
+            acts_block = "\n".join(f"- {texts[i]}" for i in ai.history_ids.get(target_day, ())) or "- (no recorded actions)"
+            fragment = self._fragments[key] = f"\nRequested Day Context:\nDay {target_day} activities:\n{acts_block}\n"
+        return fragment
+
+    def _activity_fragment(self, ai, day, activity_id):
+        key = ("activity", ai.name, day, activity_id)
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            fragment = self._fragments[key] = (
+                f"Today is Day {day}. The user is asking about this item from {ai.name}'s Daily Activities for today:\n"
+                f"- {ai.catalog.texts[activity_id]}\n")
+        return fragment
+
+    @staticmethod
+    def route(ai, day, user_input):
+        """The routing.Route for a question put to ai on day."""
+        return get_router(ai.catalog).route(user_input, day, ai.daily_activity_ids)
+
+    def turn_message(self, ai, day, user_input, memory=None, route=None):
+        """Per-turn context and question.
+
+        Returns (message, context) where context lists the session-specific
+        parts of the message, for use in a response-cache fingerprint.
+        With memory, the conversation so far is included within the budget.
+        route is the question's route, if the caller already has it.
+        """
+        today, history_index = self._day_fragments(ai, day)
+        if route is None:
+            route = self.route(ai, day, user_input)
+        focus = ""
+        if route.intent == "past_day":
+            focus = self._past_day_fragment(ai, route.day)
+        elif route.intent == "activity":
+            # Only the named item: the rules have the AI discuss just that one anyway.
+            today = self._activity_fragment(ai, day, route.activity_id)
+        context = f"{today}{history_index}{focus}\n"
+        # The route follows from the activities and question, which the fingerprint covers.
+        if memory is None:
+            return f"{context}User: {user_input}", [history_index, focus]
+
+        question = f"User: {clip_tokens(user_input, MAX_QUESTION_TOKENS)}"
+        spare = (self.budget - self.system_tokens(ai) - self._tokens(today) - self._tokens(history_index)
+                 - self._tokens(focus) - 1 - count_tokens(question))
+        conversation = memory.render(spare)
+        message = f"{context}{conversation}{question}"
+        return message, [history_index, focus, conversation]
@@ -0,0 +1,213 @@
+"""
+Session recording and replay.
+
+A game is fully determined by its session ID (which seeds `Game.rng`), the
+player's input and the LLM's replies. `SessionRecorder` appends exactly
+those to a JSON-lines log, one line per event, tagged with the session ID
+so any number of concurrent sessions can share one file:
+
+    {"session": "3f9c...", "event": "start", "format": 1, "time": ..., "out": 1234}
+    {"session": "3f9c...", "event": "input", "text": "2", "out": 5678}
+    {"session": "3f9c...", "event": "llm", "text": "...", "exited": false, "prompt": 42, "out": 9}
+    {"session": "3f9c...", "event": "end", "play_again": false}
+
+"out" is a checksum of the game output each event produced and "prompt"
+one of the prompt sent to the model. Record with `python game.py --record
+PATH` (or CHALLENGE_RECORD=PATH).
+
+`replay` re-runs recorded sessions at full speed with no player and no
+network, answering the model's turns from the log, and reports where a
+session stops matching its recording, so real traffic doubles as a
+regression corpus. With --live the recorded prompts go to the configured
+LLM backend instead, for load tests with realistic traffic.
+
+    python recording.py replay sessions.jsonl
+    python recording.py replay sessions.jsonl --live --workers 16 --repeat 5
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from session import Ask, GameSession, Generate, checksum
+
+RECORD_FORMAT = 1
+
+
+class SessionRecorder:
+    """Append-only, thread-safe JSON-lines log of session events."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+        self._lock = threading.Lock()
+
+    def record(self, session_id, event, **fields):
+        entry = {"session": session_id, "event": event}
+        if event == "start":
+            entry.update(format=RECORD_FORMAT, time=time.time())
+        entry.update(fields)
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_recorder():
+    """Return the process-wide recorder (from CHALLENGE_RECORD), or None when not recording."""
+    global _recorder
+    if _recorder is None and os.environ.get("CHALLENGE_RECORD"):
+        with _recorder_lock:
+            if _recorder is None:
+                _recorder = SessionRecorder(os.environ["CHALLENGE_RECORD"])
+    return _recorder
+
+
+def set_recorder(path):
+    """Record sessions to path from now on (None: stop recording)."""
+    global _recorder
+    with _recorder_lock:
+        if _recorder is not None:
+            _recorder.close()
+        _recorder = SessionRecorder(path) if path else None
+    return _recorder
+
+
+class ReplayDivergence(Exception):
+    """A replayed session did not follow its recording."""
+
+
+def load_sessions(path):
+    """The sessions recorded in path, as [(session ID, [event, ...])] in the order they started.
+
+    A "start" event begins a new session even if its ID was seen before.
+    Lines that do not parse (a write cut short by a crash) are skipped.
+    """
+    sessions, current = [], {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            session_id = entry.pop("session")
+            if entry["event"] == "start" or session_id not in current:
+                current[session_id] = []
+                sessions.append((session_id, current[session_id]))
+            current[session_id].append(entry)
+    return sessions
+
+
+def replay_session(session_id, events, live=False):
+    """Re-run one recorded session; returns the number of events replayed.
+
+    Raises ReplayDivergence at the first event the game no longer matches.
+    With live, replies come from the LLM backend and only the sequence of
+    effects is checked, since the prompts and output then depend on them.
+    """
+    import huggingface
+    from game import Game
+
+    session = GameSession(Game(session_id=session_id, speculate=0))
+
+    def diverged(index, why):
+        return ReplayDivergence(f"session {session_id}, event {index}: {why}")
+
+    for index, event in enumerate(events):
+        kind = event["event"]
+        if kind == "start":
+            if event.get("format") != RECORD_FORMAT:
+                raise diverged(index, f"unsupported record format {event.get('format')!r}")
+            produced = session.start()
+        elif kind == "end":
+            if not session.finished or session.play_again != event["play_again"]:
+                raise diverged(index, "the recording ends the game here, the replay does not")
+            continue
+        elif session.finished:
+            raise diverged(index, "the game is already over")
+        elif kind == "input":
+            if not isinstance(session.pending, Ask):
+                raise diverged(index, f"recorded player input, but the game wants {session.pending!r}")
+            produced = session.send(event["text"])
+        elif kind in ("llm", "llm_error"):
+            request = session.pending
+            if not isinstance(request, Generate):
+                raise diverged(index, f"recorded an LLM reply, but the game wants {request!r}")
+            if kind == "llm" and not live and zlib.crc32(request.prompt.encode("utf-8")) != event["prompt"]:
+                raise diverged(index, "the prompt differs from the recorded one")
+            if kind == "llm_error":
+                produced = session.throw(huggingface.LLMUnavailableError(event["error"]))
+            elif live:
+                text = huggingface.generate_text_game(request.prompt, request.max_tokens, persona=request.persona,
+                                                      system=request.system, cache_key=request.cache_key)
+                produced = session.send((text, event["exited"]))
+            else:
+                produced = session.send((event["text"], event["exited"]))
+        else:
+            raise diverged(index, f"unknown event {kind!r}")
+        if not live and checksum(produced) != event["out"]:
+            raise diverged(index, f"output differs from the recording after {kind!r}")
+    return len(events)
+
+
+def replay(sessions, live=False, workers=1):
+    """Replay [(session ID, events)]; returns (events replayed, [divergence messages])."""
+    def run(item):
+        try:
+            return replay_session(*item, live=live), None
+        except ReplayDivergence as error:
+            return 0, str(error)
+
+    if workers > 1:
+        with ThreadPoolExecutor(workers) as pool:
+            results = list(pool.map(run, sessions))
+    else:
+        results = [run(item) for item in sessions]
+    return sum(steps for steps, _ in results), [problem for _, problem in results if problem]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded game sessions.")
+    parser.add_argument("command", choices=("replay",))
+    parser.add_argument("log", help="a log written with --record / CHALLENGE_RECORD")
+    parser.add_argument("--session", action="append", help="only replay this session ID (repeatable)")
+    parser.add_argument("--live", action="store_true", help="send the prompts to the LLM backend instead of the recorded replies")
+    parser.add_argument("--workers", type=int, default=1, help="sessions replayed concurrently")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the log this many times")
+    args = parser.parse_args(argv)
+
+    sessions = load_sessions(args.log)
+    if args.session:
+        sessions = [(session_id, events) for session_id, events in sessions if session_id in args.session]
+    if not sessions:
+        parser.error(f"no sessions to replay in {args.log}")
+
+    started = time.perf_counter()
+    total, problems = 0, []
+    for _ in range(args.repeat):
+        steps, failed = replay(sessions, live=args.live, workers=args.workers)
+        total += steps
+        problems += failed
+    elapsed = time.perf_counter() - started
+
+    print(f"Replayed {len(sessions) * args.repeat} sessions ({total} events) in {elapsed:.2f}s, "
+          f"{total / elapsed:.0f} events/s")
+    for problem in problems:
+        print(f"diverged: {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+Question routing for AI conversations.
+
+`QuestionRouter` decides what context a player's question needs before the
+prompt is built:
+
+- "past_day": the question names a previous day ("day 2", "yesterday"),
+  so that day's activities are sent;
+- "activity": the question names one of today's activities, so only that
+  item is sent;
+- "today": anything else, with today's full list.
+
+Activities are matched on keyword stems compiled once per catalog into an
+inverted index (stem -> activity IDs). Stems shared by many activities
+("systems", "global") are left out, so a match means the player named
+the item rather than brushed past a common word.
+
+    route = get_router(catalog).route("Why did you redirect the drones?", day, ai.daily_activity_ids)
+"""
+
+import re
+import threading
+from dataclasses import dataclass
+
+STEM_LENGTH = 5          # words are matched on their first five letters
+MIN_WORD_LENGTH = 4
+MAX_STEM_ACTIVITIES = 3  # stems in more activities than this are too common to route on
+STOPWORDS = frozenset({
+    "about", "after", "again", "also", "because", "been", "before", "could", "does", "doing", "done",
+    "from", "have", "into", "just", "more", "much", "other", "over", "should", "some", "such", "tell",
+    "than", "that", "their", "them", "then", "there", "these", "they", "this", "those", "today",
+    "were", "what", "when", "where", "which", "while", "with", "would", "your",
+})
+
+_WORD = re.compile(r"[a-z0-9]+")
+_DAY = re.compile(r"\bday\s*(\d+)\b")
+_PREVIOUS_DAY = re.compile(r"\b(?:yesterday|previous day|last day)\b")
+
+
+@dataclass(frozen=True)
+class Route:
+    """What a question is about: intent plus the day or activity it names."""
+
+    intent: str                 # "today", "activity" or "past_day"
+    day: int = None
+    activity_id: int = None
+
+
+def stems(text):
+    """Keyword stems of text, in order, without duplicates."""
+    found = {}
+    for word in _WORD.findall(text.lower()):
+        if len(word) >= MIN_WORD_LENGTH and word not in STOPWORDS:
+            found[word[:STEM_LENGTH]] = None
+    return list(found)
+
+
+class QuestionRouter:
+    """Routes player questions using an index compiled from an ActivityCatalog."""
+
+    def __init__(self, catalog):
+        index = {}
+        for activity_id, text in enumerate(catalog.texts):
+            for stem in stems(text):
+                index.setdefault(stem, []).append(activity_id)
+        self.index = {stem: frozenset(ids) for stem, ids in index.items() if len(ids) <= MAX_STEM_ACTIVITIES}
+
+    def route(self, question, day, activity_ids):
+        """Route question, asked on day, to a past day, one of activity_ids or today."""
+        lowered = question.lower()
+        match = _DAY.search(lowered)
+        if match:
+            target_day = int(match.group(1))
+            if target_day != day:
+                return Route("past_day", day=target_day)
+        elif _PREVIOUS_DAY.search(lowered):
+            return Route("past_day", day=day - 1)
+
+        activity_id = self.match_activity(lowered, activity_ids)
+        if activity_id is not None:
+            return Route("activity", day=day, activity_id=activity_id)
+        return Route("today", day=day)
+
+    def match_activity(self, question, activity_ids):
+        """The activity among activity_ids that question names, or None.
+
+        The best match is taken over the whole catalog, so a question about
+        another AI's activity does not land on a loosely related one of
+        these; ties match nothing.
+        """
+        scores = {}
+        for stem in stems(question):
+            for activity_id in self.index.get(stem, ()):
+                scores[activity_id] = scores.get(activity_id, 0) + 1
+        if not scores:
+            return None
+        best = max(scores.values())
+        matches = [activity_id for activity_id, score in scores.items() if score == best]
+        if len(matches) != 1 or matches[0] not in activity_ids:
+            return None
+        return matches[0]
+
+
+_routers = {}
+_routers_lock = threading.Lock()
+
+
+def get_router(catalog):
+    """Return the process-wide QuestionRouter for catalog."""
+    router = _routers.get(catalog.crc)
+    if router is None:
+        with _routers_lock:
+            router = _routers.get(catalog.crc)
+            if router is None:
+                router = _routers[catalog.crc] = QuestionRouter(catalog)
+    return router
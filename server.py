@@ -0,0 +1,221 @@
+"""
+Asyncio multi-session game server.
+
+Every TCP connection plays its own GameSession over a plain line protocol
+(telnet or `nc` work as clients), and all sessions share one event loop:
+
+    python game.py --serve --port 7777
+
+AI replies are awaited as non-blocking streams and forwarded to the client
+as they arrive; while a reply streams, a line reading 'exit' cancels it.
+Sessions that stay silent longer than the idle timeout are closed, writes
+wait for the client to drain its buffer (backpressure), and connections
+beyond max_sessions are turned away.
+"""
+
+import asyncio
+import logging
+
+import metrics
+from huggingface import LLMUnavailableError, stream_text_game, warm_up
+from pattern_matrix import get_pattern_matrix
+from recording import get_recorder
+from session import Ask, GameOver, GameSession, Generate, Output
+from speculation import wait_for_answer
+from wordle_solver import get_solver
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 7777
+DEFAULT_MAX_SESSIONS = 10000
+DEFAULT_IDLE_TIMEOUT = 300.0        # seconds without player input
+DEFAULT_BACKLOG = 1024              # pending connections; asyncio's default of 100 drops bursts
+METRICS_EXPORT_INTERVAL = 60.0      # seconds between metric dumps while serving
+WRITE_BUFFER_HIGH_WATER = 64 * 1024
+
+
+class SessionClosed(Exception):
+    """The client disconnected or went idle."""
+
+
+class Connection:
+    """Line-oriented wrapper around one client's stream pair."""
+
+    def __init__(self, reader, writer, idle_timeout):
+        self.reader = reader
+        self.writer = writer
+        self.idle_timeout = idle_timeout
+        self.typed_ahead = []
+        writer.transport.set_write_buffer_limits(high=WRITE_BUFFER_HIGH_WATER)
+
+    async def write(self, text):
+        self.writer.write(text.replace("\n", "\r\n").encode("utf-8"))
+        await self.writer.drain()
+
+    async def read_line(self):
+        try:
+            line = await asyncio.wait_for(self.reader.readline(), self.idle_timeout)
+        except asyncio.TimeoutError:
+            await self.write("\nSession closed after inactivity.\n")
+            raise SessionClosed("idle")
+        if not line:
+            raise SessionClosed("disconnected")
+        return line.decode("utf-8", errors="replace").strip()
+
+    async def answer(self, ask):
+        """Reply to an Ask, using lines sent ahead during a conversation first."""
+        if ask.kind != "chat":
+            self.typed_ahead.clear()
+        elif self.typed_ahead:
+            line = self.typed_ahead.pop(0)
+            await self.write(f"{ask.prompt}{line}\n")
+            return line
+        await self.write(ask.prompt)
+        return await self.read_line()
+
+    async def stream_reply(self, request):
+        """Forward an AI reply as it streams; returns (text, player_exited)."""
+        ready = request.ready
+        if ready is None and request.pending is not None:
+            ready = await wait_for_answer(request)
+        if ready is not None:
+            await self.write(ready + "\n")
+            return ready, False
+        chunks = []
+
+        async def consume():
+            async for fragment in stream_text_game(request.prompt, max_tokens=request.max_tokens,
+                                                   persona=request.persona, system=request.system,
+                                                   cache_key=request.cache_key, batch=True):
+                chunks.append(fragment)
+                await self.write(fragment)
+
+        reply = asyncio.ensure_future(consume())
+        player_exited = False
+        try:
+            while not reply.done():
+                next_line = asyncio.ensure_future(self.reader.readline())
+                await asyncio.wait({reply, next_line}, return_when=asyncio.FIRST_COMPLETED)
+                if not next_line.done():
+                    next_line.cancel()
+                    break
+                line = next_line.result()
+                if not line:
+                    raise SessionClosed("disconnected")
+                line = line.decode("utf-8", errors="replace").strip()
+                if line.lower() == "exit":
+                    player_exited = True
+                    break
+                self.typed_ahead.append(line)
+        finally:
+            if not reply.done():
+                reply.cancel()
+                try:
+                    await reply
+                except asyncio.CancelledError:
+                    pass
+        await self.write(" [cancelled]\n" if player_exited else "\n")
+        if not player_exited:
+            reply.result()
+        return "".join(chunks), player_exited
+
+
+class GameServer:
+    """Hosts independent GameSessions for many TCP clients in one event loop."""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, max_sessions=DEFAULT_MAX_SESSIONS,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT, backlog=DEFAULT_BACKLOG, game_factory=None):
+        self.host = host
+        self.port = port
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.backlog = backlog
+        self.game_factory = game_factory
+        self.active_sessions = 0
+        self.total_sessions = 0
+
+    def new_game(self):
+        if self.game_factory is not None:
+            return self.game_factory()
+        from game import Game
+        return Game()
+
+    async def handle_client(self, reader, writer):
+        conn = Connection(reader, writer, self.idle_timeout)
+        if self.active_sessions >= self.max_sessions:
+            metrics.count("sessions_rejected")
+            await conn.write("Server is full, please try again later.\n")
+            writer.close()
+            return
+        self.active_sessions += 1
+        self.total_sessions += 1
+        metrics.count("sessions_started")
+        try:
+            while await self.play(conn, GameSession(self.new_game(), recorder=get_recorder())):
+                pass
+        except (SessionClosed, ConnectionError) as error:
+            metrics.count(f"sessions_{error}" if isinstance(error, SessionClosed) else "sessions_disconnected")
+            logger.debug("session ended: %s", error)
+        finally:
+            self.active_sessions -= 1
+            writer.close()
+
+    async def play(self, conn, session):
+        """Run one game over conn; returns whether the player wants another."""
+        events = session.start()
+        try:
+            while True:
+                for event in events[:-1]:
+                    if isinstance(event, Output):
+                        await conn.write(event.text)
+                effect = events[-1]
+                if isinstance(effect, GameOver):
+                    return effect.play_again
+                if isinstance(effect, Ask):
+                    line = await conn.answer(effect)
+                    if effect.kind == "wordle":
+                        # A hint ranks the whole word list; keep it off the event loop.
+                        events = await asyncio.to_thread(session.send, line)
+                    else:
+                        events = session.send(line)
+                elif isinstance(effect, Generate):
+                    try:
+                        reply = await conn.stream_reply(effect)
+                    except LLMUnavailableError as error:
+                        events = session.throw(error)
+                    else:
+                        events = session.send(reply)
+                else:
+                    raise TypeError(f"Unsupported effect: {effect!r}")
+        finally:
+            if not session.finished:
+                session.close()
+
+    async def serve_forever(self):
+        # Load the client stack and the shared Wordle tables (and the solver's
+        # opening ranking) before accepting players, so no session stalls on them.
+        warm_up().join()
+        await asyncio.to_thread(get_pattern_matrix)
+        await asyncio.to_thread(get_solver().suggest, ())
+        server = await asyncio.start_server(self.handle_client, self.host, self.port, backlog=self.backlog)
+        logger.info("serving on %s", ", ".join(str(sock.getsockname()) for sock in server.sockets))
+        exporter = asyncio.ensure_future(self.export_metrics()) if metrics.enabled() else None
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if exporter is not None:
+                exporter.cancel()
+
+    @staticmethod
+    async def export_metrics():
+        while True:
+            await asyncio.sleep(METRICS_EXPORT_INTERVAL)
+            metrics.export()
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, **options):
+    """Run a GameServer until interrupted."""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    asyncio.run(GameServer(host, port, **options).serve_forever())
@@ -0,0 +1,154 @@
+"""
+Game sessions as state machines.
+
+`Game` never touches stdin/stdout. Its interactive methods are generators
+that write text with `Game.emit` and `yield` an effect whenever they need
+something from outside:
+
+- `Ask(prompt)`        -> the player's next line of input (a str)
+- `Generate(...)`      -> an AI reply, as (text, player_exited); a frontend
+                          may raise huggingface.LLMUnavailableError into the
+                          game instead. When `ready` is set the reply already
+                          exists (generated speculatively) and is shown as is;
+                          when `pending` is set it is still being generated
+                          (see speculation.wait_for_answer).
+
+`GameSession` turns that into a plain "send an action, get events back"
+object, so one process can host any number of independent games and drive
+them from a terminal, a network server or a test at full speed:
+
+    session = GameSession(Game())
+    events = session.start()          # [Output, Output, ..., Ask]
+    events = session.send("2")        # player's answer to the pending Ask
+    ...                               # until the last event is GameOver
+
+Given a recorder (see recording.py), a session logs what it was sent
+and a checksum of what it produced, so it can be replayed later.
+"""
+
+import time
+import zlib
+from dataclasses import dataclass
+
+import metrics
+
+
+@dataclass(frozen=True)
+class Output:
+    """Text for the player, including any trailing newline."""
+
+    text: str
+
+
+@dataclass(frozen=True)
+class Ask:
+    """The game is waiting for a line of player input.
+
+    kind is "chat" while the player is talking to an AI, "wordle" for a
+    mini-game guess (answering may compute a solver hint, which servers run
+    off their event loop) and "menu" otherwise.
+    """
+
+    prompt: str
+    kind: str = "menu"
+
+
+@dataclass(frozen=True)
+class Generate:
+    """The game needs an AI reply; answer with (text, player_exited)."""
+
+    prompt: str
+    persona: str
+    max_tokens: int
+    system: str = None
+    cache_key: str = None
+    ready: str = None
+    pending: object = None      # concurrent.futures.Future of a speculative reply
+
+
+@dataclass(frozen=True)
+class GameOver:
+    """The game finished; play_again is the player's answer to the replay question."""
+
+    play_again: bool
+
+
+def checksum(events):
+    """CRC-32 of the text of the Output events, for spotting replays that diverge."""
+    return zlib.crc32("".join(event.text for event in events if isinstance(event, Output)).encode("utf-8"))
+
+
+class GameSession:
+    """Drives one Game: feeds it player actions and collects its events.
+
+    recorder, if given, gets `record(session_id, event, **fields)` calls:
+    "start", then "input" (a line), "llm" (a reply) or "llm_error" for each
+    answered effect, and "end". Each carries "out", the checksum of the
+    output it produced.
+    """
+
+    def __init__(self, game, recorder=None):
+        self.game = game
+        self.recorder = recorder
+        self.pending = None
+        self.finished = False
+        self.play_again = False
+        self._steps = game.play()
+        self._asked_at = None
+
+    def start(self):
+        """Run the game up to its first effect; returns the events produced."""
+        events = self._advance(lambda: next(self._steps))
+        self._record("start", events)
+        return events
+
+    def send(self, value):
+        """Answer the pending effect (a line for Ask, a reply for Generate)."""
+        if self.finished:
+            raise RuntimeError("Game is over.")
+        if self._asked_at is not None:
+            metrics.observe("player_think", time.perf_counter() - self._asked_at)
+        pending = self.pending
+        events = self._advance(lambda: self._steps.send(value))
+        if isinstance(pending, Generate):
+            text, exited = value
+            self._record("llm", events, text=text, exited=exited, prompt=zlib.crc32(pending.prompt.encode("utf-8")))
+        else:
+            self._record("input", events, text=value)
+        return events
+
+    def throw(self, error):
+        """Raise error inside the game at the pending effect (e.g. a failed Generate)."""
+        if self.finished:
+            raise RuntimeError("Game is over.")
+        events = self._advance(lambda: self._steps.throw(error))
+        self._record("llm_error", events, error=str(error))
+        return events
+
+    def _record(self, event, events, **fields):
+        if self.recorder is not None:
+            self.recorder.record(self.game.session_id, event, out=checksum(events), **fields)
+            if self.finished:
+                self.recorder.record(self.game.session_id, "end", play_again=self.play_again)
+
+    def close(self):
+        """Abandon the game."""
+        self._steps.close()
+        self.finished = True
+        self.pending = None
+
+    def _advance(self, step):
+        try:
+            with metrics.span("game_step"):
+                effect = step()
+        except StopIteration as stop:
+            self.finished = True
+            self.pending = None
+            self.play_again = bool(stop.value)
+            effect = GameOver(self.play_again)
+        else:
+            self.pending = effect
+        self._asked_at = time.perf_counter() if metrics.enabled() and isinstance(effect, Ask) else None
+        events = self.game.drain_output()
+        events.append(effect)
+        return events
@@ -0,0 +1,305 @@
+"""
+Headless Monte Carlo simulation of the investigation, for game balancing.
+
+Whole batches of games are simulated at once with NumPy: every array has one
+row per game. Each simulated day draws the per-AI suspicious counts as
+batched Bernoulli trials (one binomial draw, with the same guarantees as
+`Game.generate_daily_activities`), samples activity IDs without replacement
+from each AI's pools (from a table of every k-subset for small pools, else
+as the k smallest of one random key per pool entry), and lets a scripted
+strategy spend the day's energy inspecting AIs. A strategy accuses an AI as
+soon as it has seen `accuse_threshold` suspicious activities from it (the
+rule in the game intro); otherwise it is forced to accuse its top suspect
+after the last day, as on Day 4 in the game. Conversations are not simulated.
+
+Batches are spread over a process pool, so sweeps over millions of games
+finish in seconds:
+
+    python simulation.py --games 1000000 --sweep
+"""
+
+import argparse
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from itertools import combinations
+
+import numpy as np
+
+from clues import SUSPICION_THRESHOLD
+from game import CATALOG, CLEAN_SUSP_RATE, CORRUPT_SUSP_RATE, NUM_DAILY_ACTIVITIES
+
+AI_NAMES = CATALOG.ai_names
+DEFAULT_BATCH_SIZE = 100_000
+MAX_SUBSET_TABLE_ROWS = 1 << 14  # pools with at most this many k-subsets sample from a table of them
+SAMPLE_BLOCK_CELLS = 1 << 20     # games x pool entries keyed per argpartition otherwise
+
+
+@dataclass(frozen=True)
+class SimulationConfig:
+    """Balance parameters for a batch of simulated games."""
+
+    num_daily_activities: int = NUM_DAILY_ACTIVITIES
+    clean_susp_rate: float = CLEAN_SUSP_RATE
+    corrupt_susp_rate: float = CORRUPT_SUSP_RATE
+    days: int = 3
+    energy_per_day: int = 3
+    minigame_bonus: int = 2
+    minigame_win_rate: float = 0.6
+
+
+@dataclass(frozen=True)
+class Strategy:
+    """A scripted player.
+
+    order: name of the rule deciding which AIs to inspect first each day
+    ("round_robin", "focus" or "random"). Each AI is inspected at most once
+    a day; energy left over after that is unused.
+    """
+
+    name: str
+    order: str = "round_robin"
+    play_minigame: bool = True
+    accuse_threshold: int = SUSPICION_THRESHOLD
+
+
+STRATEGIES = {
+    "round_robin": Strategy("round_robin", order="round_robin"),
+    "focus": Strategy("focus", order="focus"),
+    "random": Strategy("random", order="random"),
+    "cautious": Strategy("cautious", order="focus", accuse_threshold=5),
+    "no_minigame": Strategy("no_minigame", order="round_robin", play_minigame=False),
+}
+
+
+def _activity_tables():
+    """Catalog IDs as arrays: per-AI safe/suspicious IDs and a global is-suspicious table."""
+    safe_ids = [np.array(CATALOG.pool_ids[name]["safe"], dtype=np.intp) for name in AI_NAMES]
+    susp_ids = [np.array(CATALOG.pool_ids[name]["suspicious"], dtype=np.intp) for name in AI_NAMES]
+    is_suspicious = np.array([CATALOG.is_suspicious(i) for i in range(len(CATALOG))])
+    return safe_ids, susp_ids, is_suspicious
+
+
+@lru_cache(maxsize=None)
+def _combinations(pool_size, k):
+    """Every k-subset of range(pool_size), one per row (only built for small pools)."""
+    subsets = list(combinations(range(pool_size), k))
+    return np.array(subsets, dtype=np.intp).reshape(len(subsets), k)
+
+
+def _sample_without_replacement(rng, ids, n_rows, k):
+    """(n_rows, k) draws from ids, without replacement within each row.
+
+    While the pool has at most MAX_SUBSET_TABLE_ROWS k-subsets, each row is a
+    uniformly random row of a table of them, so a whole batch is a single
+    gather. Larger pools take, per row, the positions of the k smallest of
+    len(ids) random keys, a block of rows per argpartition, so memory grows
+    with the pool size rather than with the number of subsets. Pools smaller
+    than k are topped up with repeats, as in `Game.generate_daily_activities`.
+    """
+    if k > len(ids):
+        return np.concatenate([np.broadcast_to(ids, (n_rows, len(ids))),
+                               rng.choice(ids, size=(n_rows, k - len(ids)))], axis=1)
+    if math.comb(len(ids), k) <= MAX_SUBSET_TABLE_ROWS:
+        table = _combinations(len(ids), k)
+        return ids[table[rng.integers(len(table), size=n_rows)]]
+    out = np.empty((n_rows, k), dtype=ids.dtype)
+    block = max(1, SAMPLE_BLOCK_CELLS // len(ids))
+    for start in range(0, n_rows, block):
+        keys = rng.random((min(block, n_rows - start), len(ids)), dtype=np.float32)
+        out[start:start + len(keys)] = ids[np.argpartition(keys, k - 1, axis=1)[:, :k]]
+    return out
+
+
+def sample_daily_activities(rng, is_corrupt, config, safe_ids, susp_ids):
+    """Draw one day of activity IDs, shape (games, AIs, activities), for every game.
+
+    For each AI the suspicious count is the number of successes in n
+    Bernoulli trials, drawn for all games as one binomial sample; then
+    games are grouped by that count and each group draws its suspicious and
+    safe activities without replacement in one step.
+    """
+    n_games, n_ais = is_corrupt.shape
+    n = config.num_daily_activities
+    p = np.where(is_corrupt, config.corrupt_susp_rate, config.clean_susp_rate)
+    n_susp = rng.binomial(n, p)
+    n_susp = np.where(is_corrupt, np.maximum(n_susp, 1), np.minimum(n_susp, n - 1))
+
+    activities = np.empty((n_games, n_ais, n), dtype=np.int32)
+    for a in range(n_ais):
+        for k in range(n + 1):
+            rows = np.flatnonzero(n_susp[:, a] == k)
+            if len(rows) == 0:
+                continue
+            activities[rows, a, :k] = _sample_without_replacement(rng, susp_ids[a], len(rows), k)
+            activities[rows, a, k:] = _sample_without_replacement(rng, safe_ids[a], len(rows), n - k)
+    return activities
+
+
+def _inspection_order(strategy, rng, day_index, suspicion):
+    n_games, n_ais = suspicion.shape
+    if strategy.order == "round_robin":
+        return (np.arange(n_ais)[None, :] + day_index) % n_ais + np.zeros((n_games, 1), dtype=int)
+    if strategy.order == "focus":
+        return np.argsort(-(suspicion + rng.random(suspicion.shape) * 0.5), axis=1)
+    if strategy.order == "random":
+        return np.argsort(rng.random(suspicion.shape), axis=1)
+    raise ValueError(f"Unknown inspection order {strategy.order!r}")
+
+
+def simulate_batch(n_games, strategy, config=SimulationConfig(), seed=None):
+    """Simulate n_games games and return summed statistics (see `summarize`)."""
+    rng = np.random.default_rng(seed)
+    safe_ids, susp_ids, is_suspicious = _activity_tables()
+    n_ais = len(AI_NAMES)
+    games = np.arange(n_games)
+
+    corrupted = rng.integers(n_ais, size=n_games)
+    is_corrupt = np.arange(n_ais)[None, :] == corrupted[:, None]
+    suspicion = np.zeros((n_games, n_ais), dtype=np.int32)
+    clues = np.zeros(n_games, dtype=np.int32)
+    accused = np.full(n_games, -1)
+    accusation_day = np.zeros(n_games, dtype=np.int32)
+
+    for day in range(1, config.days + 1):
+        activities = sample_daily_activities(rng, is_corrupt, config, safe_ids, susp_ids)
+        seen_suspicious = is_suspicious[activities].sum(axis=2)
+
+        energy = np.full(n_games, config.energy_per_day)
+        if strategy.play_minigame:
+            energy += config.minigame_bonus * (rng.random(n_games) < config.minigame_win_rate)
+        inspections = np.minimum(energy, n_ais)
+        investigating = accused < 0
+
+        order = _inspection_order(strategy, rng, day - 1, suspicion)
+        for slot in range(n_ais):
+            inspect = investigating & (slot < inspections)
+            target = order[:, slot]
+            suspicion[games[inspect], target[inspect]] += seen_suspicious[games[inspect], target[inspect]]
+            clues += inspect * config.num_daily_activities
+
+        top = suspicion.max(axis=1)
+        decide = investigating & (top >= strategy.accuse_threshold)
+        tie_break = rng.random(suspicion.shape) * 0.5
+        suspect = np.argmax(suspicion + tie_break, axis=1)
+        accused = np.where(decide, suspect, accused)
+        accusation_day = np.where(decide, day, accusation_day)
+
+    forced = accused < 0
+    suspect = np.argmax(suspicion + rng.random(suspicion.shape) * 0.5, axis=1)
+    accused = np.where(forced, suspect, accused)
+    accusation_day = np.where(forced, config.days + 1, accusation_day)
+
+    return {
+        "games": n_games,
+        "correct": int((accused == corrupted).sum()),
+        "forced": int(forced.sum()),
+        "accusation_day_total": int(accusation_day.sum()),
+        "accusation_day_counts": np.bincount(accusation_day, minlength=config.days + 2)[1:].tolist(),
+        "clues_total": int(clues.sum()),
+        "suspicious_clues_total": int(suspicion.sum()),
+        "corrupt_suspicious_clues_total": int(suspicion[games, corrupted].sum()),
+    }
+
+
+def _run_batch(args):
+    return simulate_batch(*args)
+
+
+def _merge(totals, batch):
+    for key, value in batch.items():
+        if isinstance(value, list):
+            totals[key] = [a + b for a, b in zip(totals.get(key, [0] * len(value)), value)]
+        else:
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def summarize(totals):
+    """Turn summed statistics into rates and means."""
+    n = totals["games"]
+    return {
+        "games": n,
+        "detection_rate": totals["correct"] / n,
+        "forced_accusation_rate": totals["forced"] / n,
+        "mean_accusation_day": totals["accusation_day_total"] / n,
+        "accusation_day_distribution": [count / n for count in totals["accusation_day_counts"]],
+        "mean_clues": totals["clues_total"] / n,
+        "mean_suspicious_clues": totals["suspicious_clues_total"] / n,
+        "mean_corrupt_suspicious_clues": totals["corrupt_suspicious_clues_total"] / n,
+    }
+
+
+def run(strategy, n_games, config=SimulationConfig(), seed=None, workers=None,
+        batch_size=DEFAULT_BATCH_SIZE, executor=None):
+    """Simulate n_games split into batches across a process pool; returns `summarize` output.
+
+    Batches get independent child seeds of seed, so results are reproducible
+    for a given seed, batch_size and n_games regardless of the worker count.
+    """
+    if isinstance(strategy, str):
+        strategy = STRATEGIES[strategy]
+    sizes = [batch_size] * (n_games // batch_size)
+    if n_games % batch_size:
+        sizes.append(n_games % batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(size, strategy, config, child) for size, child in zip(sizes, seeds)]
+
+    totals = {}
+    if executor is not None:
+        results = executor.map(_run_batch, jobs)
+    elif len(jobs) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_batch, jobs))
+    else:
+        results = map(_run_batch, jobs)
+    for batch in results:
+        _merge(totals, batch)
+    return summarize(totals)
+
+
+def sweep(strategies, n_games, clean_rates, corrupt_rates, config=SimulationConfig(), seed=None,
+          workers=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Run every strategy at every (clean, corrupt) suspicious-rate pair; one shared process pool."""
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for clean in clean_rates:
+            for corrupt in corrupt_rates:
+                point = replace(config, clean_susp_rate=clean, corrupt_susp_rate=corrupt)
+                for strategy in strategies:
+                    result = run(strategy, n_games, point, seed=seed, batch_size=batch_size, executor=pool)
+                    rows.append(dict(strategy=getattr(strategy, "name", strategy),
+                                     clean_susp_rate=clean, corrupt_susp_rate=corrupt, **result))
+    return rows
+
+
+def _print_rows(rows):
+    print(f"{'strategy':<12} {'clean':>5} {'corrupt':>7} {'detect':>7} {'forced':>7} {'day':>5} {'clues':>6}")
+    for row in rows:
+        print(f"{row['strategy']:<12} {row['clean_susp_rate']:>5.2f} {row['corrupt_susp_rate']:>7.2f} "
+              f"{row['detection_rate']:>7.3f} {row['forced_accusation_rate']:>7.3f} "
+              f"{row['mean_accusation_day']:>5.2f} {row['mean_clues']:>6.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo balance simulation for AI Corruption.")
+    parser.add_argument("--games", type=int, default=1_000_000)
+    parser.add_argument("--strategy", action="append", choices=sorted(STRATEGIES),
+                        help="strategy to simulate (repeatable; default: all)")
+    parser.add_argument("--sweep", action="store_true",
+                        help="sweep clean/corrupt suspicious rates from 0.15 to 0.55")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    strategies = [STRATEGIES[name] for name in (args.strategy or STRATEGIES)]
+    rates = [0.15, 0.25, 0.35, 0.45, 0.55]
+    clean_rates = rates if args.sweep else [CLEAN_SUSP_RATE]
+    corrupt_rates = rates if args.sweep else [CORRUPT_SUSP_RATE]
+    _print_rows(sweep(strategies, args.games, clean_rates, corrupt_rates, seed=args.seed, workers=args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Speculative pre-generation of AI answers.
+
+Once the player has looked at an AI's activities for the day, the next
+question is nearly always "why did you do X?" about one of them. With
+speculation on, the game asks the model that question for each of the
+activities in the background, on a small shared thread pool, while the
+player is still reading. A later question that the router matches to one
+of those activities (see routing.py) is answered from the pre-generated
+reply right away, as long as the conversation has not moved on since.
+
+Costs are capped: each game gets at most `calls_per_day()` speculative
+calls per day (0, the default, turns speculation off), the whole process
+keeps at most MAX_PENDING of them queued or running, and moving to the
+next day cancels whatever has not started. Set the per-day budget with
+CHALLENGE_SPECULATE, `set_calls_per_day` or `python game.py --speculate N`.
+
+Only questions that ask for the reason behind an activity (see `asks_why`)
+are answered this way; "who authorised X?" or "when did you do X?" go to
+the model as asked. An answer still being generated when the question
+comes is waited for (see `wait_for_answer`) rather than requested again;
+one still queued is cancelled and the question goes to the model as usual.
+
+Metrics: speculative_calls, speculative_hits, speculative_misses (a
+question about an activity with no usable answer), speculative_late
+(answers still being generated when asked for; each ends as a hit or a
+miss), speculative_skipped (over budget) and speculative_cancelled. The
+hit rate is hits / (hits + misses).
+"""
+
+import asyncio
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import huggingface
+import metrics
+
+DEFAULT_WORKERS = 4
+MAX_PENDING = 64            # speculative calls queued or running, across all games
+QUESTION = "Why did you do this: {activity}?"
+
+# Questions the canned QUESTION's answer also replies to: the AI's reason for something it did.
+_WHY = re.compile(r"\s*(?:why (?:did|do|would|have) you|how come you|what (?:was|is) your reason)\b", re.IGNORECASE)
+
+_calls_per_day = int(os.environ.get("CHALLENGE_SPECULATE") or 0)
+_executor = None
+_pending = 0
+_lock = threading.Lock()
+
+
+def calls_per_day():
+    """Speculative calls each game may make per day (0: speculation is off)."""
+    return _calls_per_day
+
+
+def set_calls_per_day(calls):
+    global _calls_per_day
+    _calls_per_day = max(0, int(calls))
+
+
+def asks_why(question):
+    """Whether question asks the AI why it did something, as QUESTION does."""
+    return _WHY.match(question) is not None
+
+
+def get_executor():
+    """Return the process-wide speculation thread pool."""
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=DEFAULT_WORKERS, thread_name_prefix="speculate")
+    return _executor
+
+
+def _generate(request):
+    global _pending
+    try:
+        return huggingface.generate_text_game(request.prompt, request.max_tokens, persona=request.persona,
+                                              system=request.system, cache_key=request.cache_key)
+    finally:
+        with _lock:
+            _pending -= 1
+
+
+def _release(future):
+    # A call cancelled before it started never reaches _generate's finally.
+    global _pending
+    if future.cancelled():
+        with _lock:
+            _pending -= 1
+
+
+class Speculator:
+    """One game's speculative answers for the current day, keyed by (AI name, activity ID)."""
+
+    __slots__ = ("budget", "calls", "answers")
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.calls = 0
+        self.answers = {}       # key -> (future, conversation revision it was asked at)
+
+    def submit(self, key, revision, request):
+        """Start generating the reply to request (a session.Generate) unless over budget."""
+        global _pending
+        if key in self.answers:
+            return
+        if self.calls >= self.budget:
+            metrics.count("speculative_skipped")
+            return
+        with _lock:
+            if _pending >= MAX_PENDING:
+                metrics.count("speculative_skipped")
+                return
+            _pending += 1
+        self.calls += 1
+        metrics.count("speculative_calls")
+        future = get_executor().submit(_generate, request)
+        future.add_done_callback(_release)
+        self.answers[key] = (future, revision)
+
+    def take(self, key, revision):
+        """The speculative call for key, if it was asked at this revision and can still answer; else None.
+
+        The returned future is either done with the reply or still running
+        (see wait_for_answer). A call still queued is cancelled instead, so
+        the question goes to the model once rather than twice.
+        """
+        entry = self.answers.pop(key, None)
+        if entry is not None:
+            future, asked_at = entry
+            if future.cancel():
+                metrics.count("speculative_cancelled")
+            elif asked_at == revision:
+                if not future.done():
+                    metrics.count("speculative_late")
+                    return future
+                if not future.cancelled() and future.exception() is None:
+                    metrics.count("speculative_hits")
+                    return future
+        metrics.count("speculative_misses")
+        return None
+
+    def cancel(self):
+        """Drop every answer, cancelling the calls that have not started; resets the day's budget."""
+        for future, _ in self.answers.values():
+            if future.cancel():
+                metrics.count("speculative_cancelled")
+        self.answers.clear()
+        self.calls = 0
+
+
+async def wait_for_answer(request):
+    """The reply of request's speculative call still in flight (request.pending), or None if it fails.
+
+    The call ends within its persona's timeout of starting, so this never
+    waits longer than that.
+    """
+    try:
+        reply = await asyncio.wait_for(asyncio.wrap_future(request.pending), huggingface.get_profile(request.persona).timeout)
+    except Exception:
+        metrics.count("speculative_misses")
+        return None
+    metrics.count("speculative_hits")
+    return reply
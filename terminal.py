@@ -0,0 +1,167 @@
+"""
+Terminal frontend: plays a GameSession on stdin/stdout.
+
+AI replies are streamed as they arrive, all on one event loop that lives as
+long as the frontend (so the LLM client's keep-alive connections are reused
+across turns). While a reply is streaming, an interactive stdin is watched
+without blocking: typing 'exit' cancels the reply and ends the conversation,
+other lines are kept as the player's next messages. Piped or scripted input
+is left alone and read one line per prompt.
+"""
+
+import asyncio
+import os
+import sys
+
+from huggingface import LLMUnavailableError, close_backend, stream_text_game
+from session import Ask, GameOver, Generate, Output
+from speculation import wait_for_answer
+
+
+class TerminalFrontend:
+    """Runs sessions interactively in the current terminal."""
+
+    def __init__(self):
+        self.typed_ahead = []
+        self._runner = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close the LLM client's connections and the event loop."""
+        if self._runner is not None:
+            try:
+                self._runner.run(close_backend())
+            finally:
+                self._runner.close()
+                self._runner = None
+
+    def run_async(self, coroutine):
+        """Run coroutine on the frontend's event loop, created on first use."""
+        if self._runner is None:
+            self._runner = asyncio.Runner()
+        return self._runner.run(coroutine)
+
+    def run(self, session):
+        """Play session to the end; returns whether the player wants another game."""
+        events = session.start()
+        while True:
+            for event in events[:-1]:
+                self.show(event)
+            effect = events[-1]
+            if isinstance(effect, GameOver):
+                return effect.play_again
+            if isinstance(effect, Ask):
+                events = session.send(self.read_line(effect))
+            elif isinstance(effect, Generate):
+                try:
+                    reply = self.run_async(self.stream_response(effect))
+                except LLMUnavailableError as error:
+                    events = session.throw(error)
+                else:
+                    events = session.send(reply)
+            else:
+                raise TypeError(f"Unsupported effect: {effect!r}")
+
+    @staticmethod
+    def show(event):
+        if isinstance(event, Output):
+            sys.stdout.write(event.text)
+            sys.stdout.flush()
+
+    def read_line(self, ask):
+        """Answer an Ask, using lines typed ahead during a conversation first."""
+        if ask.kind != "chat":
+            self.typed_ahead.clear()
+        elif self.typed_ahead:
+            line = self.typed_ahead.pop(0)
+            print(f"{ask.prompt}{line}")
+            return line
+        return input(ask.prompt)
+
+    async def stream_response(self, request):
+        """Print the model's reply as it streams in.
+
+        While the reply is streaming, typing 'exit' cancels it. Returns the
+        text received and whether the player exited.
+        """
+        ready = request.ready
+        if ready is None and request.pending is not None:
+            ready = await wait_for_answer(request)
+        if ready is not None:
+            print(ready)
+            return ready, False
+        chunks = []
+
+        async def consume():
+            async for fragment in stream_text_game(request.prompt, max_tokens=request.max_tokens,
+                                                   persona=request.persona, system=request.system,
+                                                   cache_key=request.cache_key):
+                chunks.append(fragment)
+                print(fragment, end="", flush=True)
+
+        reply = asyncio.ensure_future(consume())
+        exit_typed = self.watch_for_exit()
+        try:
+            if exit_typed is None:
+                await reply
+            else:
+                await asyncio.wait({reply, exit_typed}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            if exit_typed is not None:
+                exit_typed.cancel()
+            player_exited = not reply.done()
+            if player_exited:
+                reply.cancel()
+                try:
+                    await reply
+                except asyncio.CancelledError:
+                    pass
+                print(" [cancelled]")
+            else:
+                print()
+
+        if not player_exited:
+            reply.result()
+        return "".join(chunks), player_exited
+
+    def watch_for_exit(self):
+        """Future that resolves once the player types 'exit' on stdin.
+
+        Other lines typed meanwhile are kept as the player's next messages.
+        Returns None when stdin is not a terminal (piped input is always
+        readable, and would be drained into typed_ahead) or cannot be watched
+        without blocking (e.g. on event loops without add_reader support); the
+        reply then just streams.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            if not sys.stdin.isatty():
+                return None
+            fd = sys.stdin.fileno()
+        except (AttributeError, ValueError, OSError):
+            return None
+        typed = loop.create_future()
+
+        def on_line():
+            # A terminal in line mode returns at most one line per read, and
+            # reading the fd directly leaves sys.stdin's buffer untouched.
+            line = os.read(fd, 4096).decode(sys.stdin.encoding or "utf-8", errors="replace")
+            if not line:
+                loop.remove_reader(fd)
+            elif line.strip().lower() == "exit":
+                if not typed.done():
+                    typed.set_result(True)
+            else:
+                self.typed_ahead.append(line.strip())
+
+        try:
+            loop.add_reader(fd, on_line)
+        except (NotImplementedError, ValueError, OSError):
+            return None
+        typed.add_done_callback(lambda _: loop.remove_reader(fd))
+        return typed
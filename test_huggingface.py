@@ -0,0 +1,287 @@
+"""Tests for the LLM client layer: circuit breaker, sync deadline and micro-batching.
+
+Run with `python -m pytest`. The deadline tests talk to a throwaway HTTP
+server on localhost; nothing here reaches the network.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import huggingface
+from huggingface import (BatchScheduler, CircuitBreaker, ClientConfig, LLMTimeoutError, LLMUnavailableError,
+                         RouterClient, StubBackend)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(huggingface.time, "monotonic", fake)
+    return fake
+
+
+def tripped(clock, threshold=2, reset_after=30):
+    breaker = CircuitBreaker(threshold, reset_after)
+    for _ in range(threshold):
+        breaker.record_failure()
+    return breaker
+
+
+def test_breaker_opens_after_threshold_failures(clock):
+    breaker = CircuitBreaker(3, 30)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.trips == 1
+
+
+def test_breaker_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(2, 30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_half_open_allows_a_single_trial(clock):
+    breaker = tripped(clock)
+    clock.now += 30
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_successful_trial_closes_the_breaker(clock):
+    breaker = tripped(clock)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_trial_reopens_the_breaker(clock):
+    breaker = tripped(clock)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.trips == 1
+    clock.now += 30
+    assert breaker.allow()
+
+
+def test_abandoned_trial_lets_the_next_request_try(clock):
+    breaker = tripped(clock)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.abandon_trial()
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+class FakeServer:
+    """OpenAI-compatible endpoint whose every response is set by the test."""
+
+    def __init__(self, status=200, delay=0.0, retry_after=None):
+        self.status, self.delay, self.retry_after = status, delay, retry_after
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["content-length"])))
+                server.requests += 1
+                time.sleep(server.delay)
+                data = json.dumps({
+                    "id": "test", "object": "chat.completion", "created": 0, "model": body["model"],
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": "ok"}}],
+                }).encode()
+                try:
+                    self.send_response(server.status)
+                    if server.retry_after is not None:
+                        self.send_header("retry-after", str(server.retry_after))
+                    self.send_header("content-type", "application/json")
+                    self.send_header("content-length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except OSError:
+                    pass            # the client gave up waiting
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/v1"
+
+    def client(self, **config):
+        huggingface.load_client_stack()     # keep the import out of the timed calls
+        return RouterClient(ClientConfig(base_url=self.url, api_key="test", **config))
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    servers = []
+
+    def start(**kwargs):
+        servers.append(FakeServer(**kwargs))
+        return servers[-1]
+    yield start
+    for fake in servers:
+        fake.close()
+
+
+def chat(client, timeout):
+    return client.create(model="test", messages=[{"role": "user", "content": "hi"}], timeout=timeout)
+
+
+def test_create_returns_the_completion(server):
+    client = server().client()
+    assert chat(client, 5).choices[0].message.content == "ok"
+    assert client.breaker.state == "closed"
+
+
+def test_sync_deadline_covers_retries_and_backoff(server):
+    fake = server(status=503, retry_after=0.3)
+    client = fake.client(max_retries=20, breaker_threshold=100)
+    start = time.monotonic()
+    with pytest.raises(LLMTimeoutError):
+        chat(client, 1.0)
+    assert time.monotonic() - start < 1.5
+    assert 1 < fake.requests < 20
+
+
+def test_sync_deadline_cuts_a_slow_attempt_short(server):
+    client = server(delay=3).client(max_retries=3)
+    start = time.monotonic()
+    with pytest.raises(LLMTimeoutError):
+        chat(client, 0.5)
+    assert time.monotonic() - start < 1.5
+
+
+def test_refused_request_is_unavailable_and_ends_the_trial(server):
+    client = server(status=401).client(breaker_threshold=1, breaker_reset=0)
+    client.breaker.record_failure()
+    assert client.breaker.state == "half-open"
+    with pytest.raises(LLMUnavailableError):
+        chat(client, 5)
+    assert client.breaker.state == "closed"
+
+
+def test_trial_that_fails_locally_is_abandoned(server):
+    client = server().client(breaker_threshold=1, breaker_reset=0)
+    client.breaker.record_failure()
+    with pytest.raises(TypeError):
+        client.create(model="test", messages=[], not_an_argument=True)
+    assert client.breaker.state == "half-open"
+    assert client.breaker.allow()
+
+
+class RecordingStub(StubBackend):
+    """StubBackend that records every batch it is sent, as its requests' temperatures."""
+
+    def __init__(self, delay=0.0, fail_batches=False):
+        super().__init__(delay=delay)
+        self.batches = []
+        self.fail_batches = fail_batches
+
+    def batch_key(self, request):
+        return request["temperature"]
+
+    def generate_batch(self, requests):
+        self.batches.append([request["temperature"] for request in requests])
+        if self.fail_batches:
+            raise RuntimeError("batch endpoint down")
+        return super().generate_batch(requests)
+
+
+def request(prompt, persona=None):
+    return huggingface._request_args(prompt, persona, 20, None, 5)
+
+
+@pytest.fixture
+def scheduler():
+    schedulers = []
+
+    def start(backend, window=0.05, **kwargs):
+        schedulers.append(BatchScheduler(backend, window, **kwargs))
+        return schedulers[-1]
+    yield start
+    for batcher in schedulers:
+        batcher.close()
+
+
+def test_scheduler_groups_concurrent_requests(scheduler):
+    backend = RecordingStub(delay=0.05)
+    batcher = scheduler(backend)
+    requests = [request(f"question {i}") for i in range(5)]
+    futures = [batcher.submit(r) for r in requests]
+    replies = [future.result(5) for future in futures]
+    assert replies == [backend.generate(r) for r in requests]
+    assert [len(batch) for batch in backend.batches] == [5]
+
+
+def test_scheduler_respects_max_batch(scheduler):
+    backend = RecordingStub()
+    batcher = scheduler(backend, max_batch=2)
+    futures = [batcher.submit(request(f"question {i}")) for i in range(5)]
+    for future in futures:
+        future.result(5)
+    assert sorted(len(batch) for batch in backend.batches) == [1, 2, 2]
+
+
+def test_scheduler_keeps_batch_keys_apart(scheduler):
+    backend = RecordingStub()
+    batcher = scheduler(backend)
+    futures = [batcher.submit(request(f"question {i}", persona)) for i in range(3) for persona in ("ATLAS", "NEXUS")]
+    for future in futures:
+        future.result(5)
+    assert sorted(backend.batches) == [[0.6] * 3, [0.9] * 3]
+
+
+def test_scheduler_falls_back_to_single_requests(scheduler):
+    backend = RecordingStub(fail_batches=True)
+    batcher = scheduler(backend)
+    requests = [request(f"question {i}") for i in range(3)]
+    futures = [batcher.submit(r) for r in requests]
+    assert [future.result(5) for future in futures] == [StubBackend().generate(r) for r in requests]
+
+
+def test_scheduler_generate_times_out(scheduler):
+    batcher = scheduler(RecordingStub(delay=1), window=0)
+    with pytest.raises(LLMTimeoutError):
+        batcher.generate(dict(request("slow"), timeout=0.1))
+
+
+def test_closed_scheduler_sends_queued_requests_then_stops(scheduler):
+    batcher = scheduler(RecordingStub(delay=0.05))
+    futures = [batcher.submit(request(f"question {i}")) for i in range(3)]
+    batcher.close()
+    assert all(future.result(5) for future in futures)
+    batcher._thread.join(5)
+    assert not batcher._thread.is_alive()
+    with pytest.raises(RuntimeError):
+        batcher.submit(request("late"))
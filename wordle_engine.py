@@ -0,0 +1,110 @@
+"""
+Wordle feedback scoring engine.
+
+Feedback for a guess is encoded as a single base-3 integer: position i
+contributes digit * 3**i, where the digit is
+
+    0 = MISS     -> " X "  incorrect letter
+    1 = PRESENT  -> "(X)"  correct letter in the wrong position
+    2 = CORRECT  -> "[X]"  correct letter in the correct position
+
+so every pattern fits in 0..242 (a uint8), and ALL_CORRECT == 242.
+Duplicate letters follow the mini-game rules: exact matches are claimed first,
+then remaining letters are marked present left to right while unclaimed copies
+exist in the answer.
+
+`score_guess` scores a single pair in pure Python; `score_batch` scores one
+guess against N answers (or N guesses against N answers) in one NumPy call.
+"""
+
+import numpy as np
+
+from wordlist import WORD_LENGTH
+
+MISS, PRESENT, CORRECT = 0, 1, 2
+NUM_PATTERNS = 3 ** WORD_LENGTH
+ALL_CORRECT = NUM_PATTERNS - 1
+
+
+def score_guess(guess, answer):
+    """Return the pattern code for guess scored against answer."""
+    answer_chars = list(answer)
+    digits = [MISS] * WORD_LENGTH
+    for i, ch in enumerate(guess):
+        if ch == answer_chars[i]:
+            digits[i] = CORRECT
+            answer_chars[i] = None
+    for i, ch in enumerate(guess):
+        if digits[i] == MISS and ch in answer_chars:
+            digits[i] = PRESENT
+            answer_chars[answer_chars.index(ch)] = None
+    return sum(d * 3 ** i for i, d in enumerate(digits))
+
+
+def decode_pattern(code):
+    """Split a pattern code into its per-position digits."""
+    digits = []
+    for _ in range(WORD_LENGTH):
+        code, digit = divmod(code, 3)
+        digits.append(digit)
+    return digits
+
+
+def format_feedback(guess, code):
+    """Render a pattern code with the mini-game's [X]/(X)/ X  notation."""
+    feedback = []
+    for ch, digit in zip(guess, decode_pattern(code)):
+        if digit == CORRECT:
+            feedback.append(f"[{ch}]")
+        elif digit == PRESENT:
+            feedback.append(f"({ch})")
+        else:
+            feedback.append(f" {ch} ")
+    return " ".join(feedback)
+
+
+def encode_words(words):
+    """Convert words (or a WordList) to an (N, 5) uint8 array of letter indices 0-25."""
+    packed = getattr(words, "packed", None)
+    if packed is None:
+        if isinstance(words, str):
+            words = [words]
+        packed = "".join(words).encode("ascii")
+    return (np.frombuffer(packed, dtype=np.uint8) - ord("a")).reshape(-1, WORD_LENGTH)
+
+
+def _as_letter_array(words):
+    if isinstance(words, np.ndarray):
+        return words.astype(np.uint8, copy=False)
+    return encode_words(words)
+
+
+def score_batch(guesses, answers):
+    """Score guesses against answers and return an array of uint8 pattern codes.
+
+    Each argument may be a single word, a sequence of words, a WordList or an
+    array from `encode_words`. A single guess is broadcast against all answers;
+    otherwise guesses and answers are scored pairwise and must have equal length.
+    """
+    g = _as_letter_array(guesses)
+    a = _as_letter_array(answers)
+    g, a = np.broadcast_arrays(g, a)
+    g_cols = [np.ascontiguousarray(g[:, i]) for i in range(WORD_LENGTH)]
+    a_cols = [np.ascontiguousarray(a[:, i]) for i in range(WORD_LENGTH)]
+    open_cols = [g_cols[i] != a_cols[i] for i in range(WORD_LENGTH)]
+
+    codes = np.zeros(g.shape[0], dtype=np.uint8)
+    for i in range(WORD_LENGTH):
+        # Guess position i is PRESENT when the answer still holds an unclaimed
+        # copy of its letter: fewer earlier non-exact uses of the letter in the
+        # guess than non-exact copies of it in the answer.
+        letter = g_cols[i]
+        available = np.zeros(g.shape[0], dtype=np.uint8)
+        claimed = np.zeros(g.shape[0], dtype=np.uint8)
+        for k in range(WORD_LENGTH):
+            available += (a_cols[k] == letter) & open_cols[k]
+            if k < i:
+                claimed += (g_cols[k] == letter) & open_cols[k]
+        present = open_cols[i] & (claimed < available)
+        codes += np.where(open_cols[i], present, CORRECT).astype(np.uint8) * np.uint8(3 ** i)
+    return codes
@@ -0,0 +1,128 @@
+"""
+Entropy-based hint engine and solver for the Wordle mini-game.
+
+Given the guesses made so far (each with its pattern code), the solver narrows
+the candidate answers with the pattern matrix and ranks next guesses by their
+expected information gain over the remaining candidates:
+
+    H(guess) = -sum_p P(p) * log2 P(p)
+
+where P(p) is the fraction of remaining candidates that would show pattern p.
+Everything is table lookups and one flattened bincount per block of guesses
+over the pattern matrix, so a ranking over the whole list answers in tens of
+milliseconds with a few MB of scratch memory; the opening ranking (no guesses
+yet) is computed once and reused. The game runs hints in a worker thread when
+serving network players, so they never stall the event loop.
+
+Headless use:
+
+    solver = WordleSolver()
+    solver.suggest([("crane", code)], top_n=3)
+    solver.solve("cigar")   # -> list of guesses a bot would play
+"""
+
+import threading
+
+import numpy as np
+
+from pattern_matrix import get_pattern_matrix
+from wordle_engine import ALL_CORRECT, NUM_PATTERNS
+
+MAX_ATTEMPTS = 6
+ENTROPY_BLOCK_CELLS = 1 << 17    # guess x candidate (or pattern) cells per bincount
+
+
+class WordleSolver:
+    """Candidate narrowing and expected-information ranking over a PatternMatrix."""
+
+    def __init__(self, patterns=None):
+        self.patterns = patterns or get_pattern_matrix()
+        self.word_list = self.patterns.word_list
+        self._opening = None
+
+    def candidates(self, history):
+        """Return the indices of answers consistent with every (guess, pattern) in history."""
+        remaining = np.arange(len(self.word_list), dtype=np.intp)
+        for guess, pattern in history:
+            remaining = self.patterns.remaining(remaining, guess, pattern)
+        return remaining
+
+    def entropies(self, candidates):
+        """Expected information (bits) of every word in the list as the next guess."""
+        n_words = len(self.word_list)
+        n_candidates = len(candidates)
+        if n_candidates <= 1:
+            return np.zeros(n_words)
+        if n_candidates == n_words:
+            columns = self.patterns.matrix
+        else:
+            columns = self.patterns.matrix[:, candidates]
+        bits = np.empty(n_words)
+        block = max(1, ENTROPY_BLOCK_CELLS // max(n_candidates, NUM_PATTERNS))
+        offsets = np.arange(block, dtype=np.int32)[:, None] * NUM_PATTERNS
+        for start in range(0, n_words, block):
+            rows = columns[start:start + block]
+            # Pattern counts of every guess in the block, as one bincount over row * 243 + pattern.
+            counts = np.bincount((rows + offsets[:len(rows)]).ravel(), minlength=len(rows) * NUM_PATTERNS)
+            seen = np.flatnonzero(counts)
+            probs = counts[seen] / n_candidates
+            bits[start:start + len(rows)] = -np.bincount(seen // NUM_PATTERNS, weights=probs * np.log2(probs),
+                                                         minlength=len(rows))
+        return bits
+
+    def rank(self, candidates, top_n=5):
+        """Return the top_n (word, bits) pairs for the given candidate indices.
+
+        Ties are broken in favour of words that could themselves be the answer.
+        """
+        if len(candidates) == 0:
+            return []
+        if len(candidates) <= 2:
+            return [(self.word_list.word_at(i), 0.0) for i in candidates[:top_n]]
+        bits = self.entropies(candidates)
+        is_candidate = np.zeros(len(bits), dtype=bool)
+        is_candidate[candidates] = True
+        order = np.lexsort((~is_candidate, -bits))[:top_n]
+        return [(self.word_list.word_at(i), float(bits[i])) for i in order]
+
+    def suggest(self, history, top_n=5):
+        """Rank the best next guesses after history."""
+        if not history:
+            if self._opening is None or len(self._opening) < top_n:
+                self._opening = self.rank(self.candidates(()), top_n=max(top_n, 10))
+            return self._opening[:top_n]
+        return self.rank(self.candidates(history), top_n=top_n)
+
+    def remaining_count(self, history):
+        """Number of answers still possible after history."""
+        return len(self.candidates(history))
+
+    def solve(self, answer, max_attempts=MAX_ATTEMPTS):
+        """Play greedily against answer and return the guesses made (a bot / difficulty probe)."""
+        history = []
+        guesses = []
+        for _ in range(max_attempts):
+            suggestions = self.suggest(history, top_n=1)
+            if not suggestions:
+                break
+            guess = suggestions[0][0]
+            guesses.append(guess)
+            pattern = self.patterns.pattern(guess, answer)
+            if pattern == ALL_CORRECT:
+                break
+            history.append((guess, pattern))
+        return guesses
+
+
+_solver = None
+_solver_lock = threading.Lock()
+
+
+def get_solver():
+    """Return the process-wide solver for the game's word list."""
+    global _solver
+    if _solver is None:
+        with _solver_lock:
+            if _solver is None:
+                _solver = WordleSolver()
+    return _solver
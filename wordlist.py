@@ -0,0 +1,85 @@
+"""
+Word list store for the Wordle mini-game.
+
+The list is read from disk once per process (lazily, on first use) and kept in
+two forms: a frozenset for O(1) membership checks and a packed fixed-width
+byte string (5 bytes per word) for compact storage and random sampling.
+
+Set the WORDLE_WORDS_PATH environment variable to point the game at a different
+(e.g. larger) dictionary file without touching the code.
+"""
+
+import json
+import os
+import random
+import threading
+
+WORD_LENGTH = 5
+DEFAULT_WORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wordle_words.json")
+
+
+class WordList:
+    """Immutable, indexed collection of fixed-length lowercase words."""
+
+    def __init__(self, words, path=None):
+        ordered = []
+        seen = set()
+        for word in words:
+            word = word.strip().lower()
+            if len(word) != WORD_LENGTH or not word.isascii() or not word.isalpha():
+                raise ValueError(f"Invalid word in list: {word!r}")
+            if word not in seen:
+                seen.add(word)
+                ordered.append(word)
+        if not ordered:
+            raise ValueError("Word list is empty.")
+
+        self.path = path
+        self.words = frozenset(ordered)
+        self.packed = "".join(ordered).encode("ascii")
+        self._index = {word: i for i, word in enumerate(ordered)}
+
+    def __len__(self):
+        return len(self.packed) // WORD_LENGTH
+
+    def __contains__(self, word):
+        return word in self.words
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.word_at(i)
+
+    def word_at(self, i):
+        """Return the word stored at position i of the packed array."""
+        start = i * WORD_LENGTH
+        return self.packed[start:start + WORD_LENGTH].decode("ascii")
+
+    def index_of(self, word):
+        """Return the position of word in the list, or None if it is not present."""
+        return self._index.get(word)
+
+    def random_word(self, rng=random):
+        """Pick a random word using the given random source."""
+        return self.word_at(rng.randrange(len(self)))
+
+
+def load_word_list(path):
+    """Read a JSON array of words from path and build a WordList."""
+    with open(path, "r", encoding="utf-8") as f:
+        return WordList(json.load(f), path=path)
+
+
+_word_lists = {}
+_lock = threading.Lock()
+
+
+def get_word_list(path=None):
+    """Return the process-wide WordList for path, loading it on first use."""
+    path = os.path.abspath(path or os.environ.get("WORDLE_WORDS_PATH") or DEFAULT_WORDS_PATH)
+    word_list = _word_lists.get(path)
+    if word_list is None:
+        with _lock:
+            word_list = _word_lists.get(path)
+            if word_list is None:
+                word_list = _word_lists[path] = load_word_list(path)
+    return word_list